@@ -0,0 +1,45 @@
+from collections import Counter
+
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+
+
+async def parse_ndjson(request: Request, schema: type[BaseModel]) -> tuple[list[dict], list[int], list[dict]]:
+    """Читает тело запроса построчно (NDJSON) и валидирует каждую строку.
+
+    Возвращает валидные строки, их номера во входном потоке и статусы невалидных строк.
+    """
+    rows, positions, errors = [], [], []
+    buffer = b""
+    index = 0
+
+    def consume(line: bytes):
+        nonlocal index
+        if not line.strip():
+            return
+        try:
+            rows.append(schema.model_validate_json(line).model_dump())
+            positions.append(index)
+        except ValidationError as e:
+            errors.append({"index": index, "status": "invalid", "id": None,
+                           "errors": [{"msg": err["msg"], "loc": err["loc"]} for err in e.errors()]})
+        index += 1
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            consume(line)
+    consume(buffer)
+    return rows, positions, errors
+
+
+def bulk_report(statuses: list[dict], positions: list[int] | None = None, errors: list[dict] = ()) -> dict:
+    """Сводка по результатам пакетной загрузки.
+
+    positions переводит индексы строк, переданных в DAO, в номера строк исходного запроса.
+    """
+    if positions is not None:
+        statuses = [{**item, "index": positions[item["index"]]} for item in statuses]
+    statuses = sorted([*statuses, *errors], key=lambda item: item["index"])
+    return {"summary": dict(Counter(item["status"] for item in statuses)), "rows": statuses}
@@ -1,4 +1,6 @@
 import os
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,6 +12,55 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     SECRET_KEY: str
     ALGORITHM: str
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    FIELD_AREA_TOLERANCE: float = 0.1
+    RESPONSE_CACHE_TTL: int = 300
+    RESPONSE_CACHE_SIZE: int = 2_000
+    FRAGMENT_CACHE_TTL: int = 3600
+    FRAGMENT_CACHE_SIZE: int = 50_000
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    THUMBNAIL_SIZES: tuple[int, ...] = (160, 480, 1024)
+    IMAGE_WEBP_QUALITY: int = 80
+    IMAGE_WORKERS: int = 2
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    MAP_CACHE_TTL: int = 24 * 3600
+    MAP_CACHE_SIZE: int = 256
+    MAP_WORKERS: int = 2
+    # Для RS*/ES* токены подписываются закрытым ключом, а проверить их можно по открытому без обращения к нам
+    JWT_PRIVATE_KEY_FILE: str | None = None
+    JWT_PUBLIC_KEY_FILE: str | None = None
+    TOKEN_CACHE_SIZE: int = 10_000
+    REVOKED_FAMILY_CACHE_SIZE: int = 100_000
+    REFRESH_TOKEN_COMPACT_INTERVAL: int = 3600
+    # Ограничение попыток входа: емкость корзины и пополнение в минуту
+    LOGIN_IP_BURST: int = 20
+    LOGIN_IP_PER_MINUTE: float = 10
+    LOGIN_EMAIL_BURST: int = 5
+    LOGIN_EMAIL_PER_MINUTE: float = 1
+    RATE_LIMIT_STORE_SIZE: int = 100_000
+    # Общее хранилище для нескольких воркеров, например redis://localhost:6379/0
+    RATE_LIMIT_REDIS_URL: str | None = None
+    # Реплика для чтения; без DB_REPLICA_HOST все запросы идут в основную БД
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: int | None = None
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_INTERVAL: float = 5.0
+    # Сколько секунд после изменения данных клиент читает из основной БД
+    READ_YOUR_WRITES_SECONDS: int = 10
+    # Отладка: число SQL-запросов и подозрения на N+1 в заголовках ответа
+    QUERY_DEBUG_HEADERS: bool = False
+    # Сколько повторов одного запроса за HTTP-запрос считать N+1
+    N_PLUS_ONE_THRESHOLD: int = 3
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
     )
@@ -23,5 +74,12 @@ def get_db_url():
             f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
 
 
+def get_replica_db_url():
+    if not settings.DB_REPLICA_HOST:
+        return None
+    return (f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@"
+            f"{settings.DB_REPLICA_HOST}:{settings.DB_REPLICA_PORT or settings.DB_PORT}/{settings.DB_NAME}")
+
+
 def get_auth_data():
     return {"secret_key": settings.SECRET_KEY, "algorithm": settings.ALGORITHM}
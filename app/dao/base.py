@@ -1,21 +1,133 @@
-from sqlalchemy.exc import SQLAlchemyError
+import functools
+import inspect
+
+from sqlalchemy import func, literal, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 
+from app.database import on_commit
+from app.http_cache import invalidate_responses
+from app.metrics import query_source
+
+# Из строки короче трех символов pg_trgm не извлекает ни одной триграммы: триграммный индекс
+# не сужает выборку, и ILIKE '%...%' читает таблицу целиком
+SEARCH_MIN_LENGTH = 3
+
+
+def _with_query_source(func):
+    """Помечает SQL-запросы, выполненные внутри метода DAO, его именем (для метрик)."""
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def stream_wrapper(cls, *args, **kwargs):
+            # Генератор может закрываться в чужом контексте, поэтому прежнее значение восстанавливается вручную
+            previous = query_source.get()
+            query_source.set(f"{cls.__name__}.{func.__name__}")
+            try:
+                async for item in func(cls, *args, **kwargs):
+                    yield item
+            finally:
+                query_source.set(previous)
+        return stream_wrapper
+
+    @functools.wraps(func)
+    async def wrapper(cls, *args, **kwargs):
+        token = query_source.set(f"{cls.__name__}.{func.__name__}")
+        try:
+            return await func(cls, *args, **kwargs)
+        finally:
+            query_source.reset(token)
+    return wrapper
+
+
+def _instrument_methods(cls) -> None:
+    for name, attribute in list(vars(cls).items()):
+        if isinstance(attribute, classmethod):
+            func = attribute.__func__
+            if inspect.iscoroutinefunction(func) or inspect.isasyncgenfunction(func):
+                setattr(cls, name, classmethod(_with_query_source(func)))
+
 
 class BaseDAO:
     model = None
+    # Уникальные колонки, по которым bulk_upsert определяет конфликт
+    upsert_key: tuple[str, ...] = ()
+    bulk_batch_size = 500
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _instrument_methods(cls)
+
+    @classmethod
+    def list_options(cls) -> tuple:
+        """Опции загрузки связей для списочных запросов (find_all / stream_all)."""
+        return ()
 
     @classmethod
-    async def find_all(cls, session: AsyncSession, **filter_by):
-        query = select(cls.model)
+    def _list_query(cls, limit: int | None = None, after_id: int | None = None, **filter_by):
+        """Запрос для постраничной выборки по ключу (keyset) на поле id."""
+        query = select(cls.model).options(*cls.list_options())
         if filter_by:
             query = query.filter_by(**filter_by)
+        return cls._paginate(query, limit=limit, after_id=after_id)
+
+    @classmethod
+    def _paginate(cls, query, limit: int | None = None, after_id: int | None = None):
+        if after_id is not None:
+            query = query.where(cls.model.id > after_id)
+        query = query.order_by(cls.model.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    @classmethod
+    async def find_all(cls, session: AsyncSession, limit: int | None = None, after_id: int | None = None,
+                       **filter_by):
+        query = cls._list_query(limit=limit, after_id=after_id, **filter_by)
         result = await session.execute(query)
         return result.scalars().all()
 
+    @classmethod
+    async def stream_all(cls, session: AsyncSession, limit: int | None = None, after_id: int | None = None,
+                         **filter_by):
+        """Отдает записи по мере чтения из серверного курсора, не загружая всю таблицу в память."""
+        query = cls._list_query(limit=limit, after_id=after_id, **filter_by)
+        result = await session.stream(query)
+        async for entity in result.scalars():
+            yield entity
+
+    @classmethod
+    def search_options(cls) -> tuple:
+        """Опции загрузки связей для результатов search."""
+        return ()
+
+    @classmethod
+    async def search(cls, session: AsyncSession, text: str, limit: int = 20, offset: int = 0):
+        """Нечеткий поиск по колонке search_text модели с триграммным индексом.
+
+        Находит подстроки и слова с опечатками; сначала идут совпадения по началу строки,
+        затем по убыванию word_similarity. Строки короче SEARCH_MIN_LENGTH символов (без учета
+        пробелов по краям) не ищутся: возвращается пустой список.
+        """
+        if len(text.strip()) < SEARCH_MIN_LENGTH:
+            return []
+        result = await session.execute(cls._search_query(text, limit=limit, offset=offset))
+        return result.scalars().all()
+
+    @classmethod
+    def _search_query(cls, text: str, limit: int = 20, offset: int = 0):
+        column = cls.model.search_text
+        return (
+            select(cls.model).options(*cls.search_options())
+            .where(or_(column.icontains(text, autoescape=True), literal(text).op('<%')(column)))
+            .order_by(column.istartswith(text, autoescape=True).desc(),
+                      func.word_similarity(text, column).desc(), cls.model.id)
+            .limit(limit).offset(offset)
+        )
+
     @classmethod
     async def find_one_or_none_by_id(cls, session: AsyncSession, data_id: int):
         result = await session.execute(select(cls.model).filter_by(id=data_id))
@@ -29,15 +141,57 @@ class BaseDAO:
         result = await session.execute(select(cls.model).filter_by(**filter_by))
         return result.scalar_one_or_none()
 
+    @classmethod
+    async def get_version(cls, session: AsyncSession) -> tuple:
+        """Версия данных таблицы для ETag: число строк и время последнего изменения."""
+        result = await session.execute(select(func.count(), func.max(cls.model.updated_at)).select_from(cls.model))
+        return tuple(result.one())
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Сбрасывает закэшированные HTTP-ответы, построенные по таблице модели."""
+        invalidate_responses(cls.model.__tablename__)
+
+    @classmethod
+    def invalidate_cache_on_commit(cls, session: AsyncSession) -> None:
+        on_commit(session, cls.invalidate_cache)
+
+    @classmethod
+    def changed_keys(cls, entities: list) -> set:
+        """Ключи производных данных (сводных таблиц), затронутых изменением записей.
+
+        Вызывается до flush, поэтому может учитывать прежние значения из истории атрибутов.
+        """
+        return set()
+
+    @classmethod
+    async def bulk_changed_keys(cls, session: AsyncSession, rows: list[dict]) -> set:
+        """То же для пакетной вставки, которая идет в обход ORM."""
+        return set()
+
+    @classmethod
+    async def on_changed(cls, session: AsyncSession, keys: set) -> None:
+        """Обновляет производные данные в текущей транзакции."""
+
+    @classmethod
+    async def on_inserted(cls, session: AsyncSession, ids: set) -> None:
+        """Вызывается после вставки новых записей, когда их id уже известны."""
+
+    # Методы записи выполняют только flush: транзакцию фиксирует владелец сессии (get_db_session)
+
     @classmethod
     async def add(cls, session: AsyncSession, **values):
         new_instance = cls.model(**values)
         session.add(new_instance)
         try:
-            await session.commit()
+            keys = cls.changed_keys([new_instance])
+            await session.flush()
+            await cls.on_changed(session, keys)
+            await cls.on_inserted(session, {new_instance.id})
         except SQLAlchemyError as e:
             await session.rollback()
             raise HTTPException(status_code=400, detail=str(e))
+        cls.invalidate_cache_on_commit(session)
         return new_instance
 
     @classmethod
@@ -45,11 +199,114 @@ class BaseDAO:
         for key, value in values.items():
             setattr(entity, key, value)
         session.add(entity)
-        await session.commit()
+        keys = cls.changed_keys([entity])
+        await session.flush()
+        await cls.on_changed(session, keys)
+        cls.invalidate_cache_on_commit(session)
         return entity
 
     @classmethod
     async def delete(cls, session: AsyncSession, entity):
+        keys = cls.changed_keys([entity])
         await session.delete(entity)
-        await session.commit()
-        return {"message": "Entity deleted"}
\ No newline at end of file
+        await session.flush()
+        await cls.on_changed(session, keys)
+        cls.invalidate_cache_on_commit(session)
+        return {"message": "Entity deleted"}
+
+    @classmethod
+    async def bulk_add(cls, session: AsyncSession, rows: list[dict]) -> list[dict]:
+        """Пакетная вставка; строки, уже существующие по upsert_key, пропускаются."""
+        return await cls._bulk_insert(session, rows, upsert=False)
+
+    @classmethod
+    async def bulk_upsert(cls, session: AsyncSession, rows: list[dict]) -> list[dict]:
+        """Пакетная вставка с обновлением существующих строк по upsert_key."""
+        return await cls._bulk_insert(session, rows, upsert=True)
+
+    @classmethod
+    def prepare_rows(cls, rows: list[dict]) -> list[dict]:
+        """Дополняет строки перед пакетной вставкой в обход ORM (вычисляемые колонки и т.п.)."""
+        return rows
+
+    @classmethod
+    def _row_key(cls, row: dict) -> tuple:
+        return tuple(row.get(column) for column in cls.upsert_key)
+
+    @classmethod
+    def _bulk_statement(cls, rows: list[dict], upsert: bool):
+        stmt = insert(cls.model).values(rows)
+        key_columns = [getattr(cls.model, column) for column in cls.upsert_key]
+        if upsert:
+            update_columns = {column: getattr(stmt.excluded, column)
+                              for column in rows[0] if column not in cls.upsert_key}
+            stmt = stmt.on_conflict_do_update(index_elements=list(cls.upsert_key),
+                                              set_={**update_columns, "updated_at": func.now()})
+        else:
+            # Пропускаются только конфликты по upsert_key; нарушение других ограничений вызывает IntegrityError
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(cls.upsert_key))
+        # xmax = 0 только у вставленных строк, у обновленных он равен id текущей транзакции
+        return stmt.returning(cls.model.id, literal_column("xmax = 0").label("inserted"), *key_columns)
+
+    @classmethod
+    async def _execute_batch(cls, session: AsyncSession, rows: list[dict], upsert: bool) -> list:
+        async with session.begin_nested():
+            result = await session.execute(cls._bulk_statement(rows, upsert))
+            return result.all()
+
+    @classmethod
+    async def _bulk_insert(cls, session: AsyncSession, rows: list[dict], upsert: bool) -> list[dict]:
+        """Возвращает статус каждой входной строки: inserted, updated, skipped, duplicate или error.
+
+        error — строка нарушила другое ограничение (например, уникальность phone_number); остальные строки
+        при этом сохраняются, а текст ошибки попадает в поле error.
+        """
+        if not cls.upsert_key:
+            raise ValueError(f"{cls.__name__}.upsert_key не задан")
+        rows = cls.prepare_rows(rows)
+        statuses = [{"index": index, "status": "skipped", "id": None} for index in range(len(rows))]
+
+        # Повторы ключа внутри запроса: при вставке побеждает первая строка, при upsert — последняя
+        # (ON CONFLICT DO UPDATE не может изменить одну строку дважды)
+        positions = {}
+        for index, row in enumerate(rows):
+            key = cls._row_key(row)
+            if key not in positions:
+                positions[key] = index
+            elif upsert:
+                statuses[positions[key]]["status"] = "duplicate"
+                positions[key] = index
+            else:
+                statuses[index]["status"] = "duplicate"
+        pending = sorted(positions.values())
+
+        try:
+            keys = await cls.bulk_changed_keys(session, [rows[index] for index in pending])
+            for start in range(0, len(pending), cls.bulk_batch_size):
+                batch = pending[start:start + cls.bulk_batch_size]
+                try:
+                    returned_rows = await cls._execute_batch(session, [rows[index] for index in batch], upsert)
+                except IntegrityError:
+                    # Пачка откатилась до точки сохранения; построчная вставка находит строки с ошибкой
+                    returned_rows = []
+                    for index in batch:
+                        try:
+                            returned_rows += await cls._execute_batch(session, [rows[index]], upsert)
+                        except IntegrityError as e:
+                            statuses[index]["status"] = "error"
+                            statuses[index]["error"] = str(e.orig)
+
+                for returned in returned_rows:
+                    index = positions[tuple(returned[2:])]
+                    statuses[index]["id"] = returned.id
+                    statuses[index]["status"] = "inserted" if returned.inserted else "updated"
+            await cls.on_changed(session, keys)
+            await cls.on_inserted(session, {item["id"] for item in statuses if item["status"] == "inserted"})
+        except SQLAlchemyError as e:
+            await session.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        cls.invalidate_cache_on_commit(session)
+        return statuses
+
+
+_instrument_methods(BaseDAO)
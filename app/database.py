@@ -1,11 +1,17 @@
+import asyncio
+import time
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Callable
 
-from sqlalchemy import func
+from fastapi import Request
+from sqlalchemy import event, func, text
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs, AsyncSession
-from sqlalchemy.orm import DeclarativeBase, declared_attr, Mapped, mapped_column
+from sqlalchemy.orm import DeclarativeBase, declared_attr, Mapped, mapped_column, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.config import get_db_url
+from app.config import get_db_url, get_replica_db_url, settings
 
 # Настройка аннотаций
 int_pk = Annotated[int, mapped_column(primary_key=True)]
@@ -14,11 +20,128 @@ updated_at = Annotated[datetime, mapped_column(server_default=func.now(), onupda
 str_uniq = Annotated[str, mapped_column(unique=True, nullable=False)]
 str_null_true = Annotated[str, mapped_column(nullable=True)]
 
+
+class PoolMetrics:
+    """Счетчики ожидания соединения из пула."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        self.checkouts += 1
+        self.timeouts += timed_out
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время ожидания свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        # Ошибки подключения и отмена — не ожидание пула, в метрики они не попадают
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def get_pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checked_in": pool.checkedin(),
+        "checkouts": pool_metrics.checkouts,
+        "timeouts": pool_metrics.timeouts,
+        "wait_seconds_total": pool_metrics.wait_seconds_total,
+        "wait_seconds_max": pool_metrics.wait_seconds_max,
+    }
+
+
+def _create_engine(url: str, poolclass=AsyncAdaptedQueuePool):
+    return create_async_engine(
+        make_url(url).update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        ),
+        echo=settings.DB_ECHO,
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+
 # Асинхронный движок и сессии
 DATABASE_URL = get_db_url()
-engine = create_async_engine(DATABASE_URL, echo=True)  # Включено логгирование
+engine = _create_engine(DATABASE_URL, poolclass=MeasuredQueuePool)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+# Реплика для чтения (необязательна)
+REPLICA_URL = get_replica_db_url()
+read_engine = _create_engine(REPLICA_URL) if REPLICA_URL else None
+async_read_session_maker = async_sessionmaker(read_engine, expire_on_commit=False) if read_engine else None
+# Cookie со временем (unix), до которого клиент читает из основной БД после своих изменений
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+
+# Отставание реплики в секундах: 0, если все полученные изменения уже применены
+REPLICA_LAG_SQL = text("""
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END
+""")
+
+
+class ReplicaState:
+    """Последний замер отставания реплики; до первого успешного замера реплика не используется."""
+
+    def __init__(self):
+        self.lag_seconds: float | None = None
+        self.healthy = False
+
+    def record(self, lag_seconds: float | None):
+        self.lag_seconds = lag_seconds
+        self.healthy = lag_seconds is not None and lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+replica_state = ReplicaState()
+
+
+async def monitor_replica_lag() -> None:
+    """Фоновая задача: периодически замеряет отставание реплики."""
+    while True:
+        try:
+            async with read_engine.connect() as connection:
+                lag = (await connection.execute(REPLICA_LAG_SQL)).scalar()
+            replica_state.record(None if lag is None else float(lag))
+        except (SQLAlchemyError, OSError):
+            replica_state.record(None)
+        await asyncio.sleep(settings.REPLICA_LAG_CHECK_INTERVAL)
+
+
+def read_session_maker(request: Request) -> async_sessionmaker:
+    """Фабрика сессий для чтения: реплика, если она успевает за основной БД
+    и клиент недавно ничего не изменял (иначе он может не увидеть свои изменения)."""
+    if async_read_session_maker is None or not replica_state.healthy:
+        return async_session_maker
+    try:
+        if float(request.cookies.get(PRIMARY_STICKY_COOKIE, 0)) > time.time():
+            return async_session_maker
+    except ValueError:
+        pass
+    return async_read_session_maker
+
 
 class Base(AsyncAttrs, DeclarativeBase):
     __abstract__ = True
@@ -31,7 +154,41 @@ class Base(AsyncAttrs, DeclarativeBase):
     updated_at: Mapped[updated_at]
 
 
-# Функция для получения сессии
+def on_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Откладывает callback (сброс кэшей и т.п.) до успешного commit транзакции сессии."""
+    session.info.setdefault('on_commit', []).append(callback)
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_on_commit(session: Session) -> None:
+    for callback in session.info.pop('on_commit', ()):
+        callback()
+
+
+# after_rollback срабатывает и на откате SAVEPOINT (неудачный пакет в begin_nested),
+# поэтому отложенные callback'и сбрасываются только по завершении корневой транзакции.
+# После commit список уже пуст: его забирает _run_on_commit
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_on_commit(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop('on_commit', None)
+
+
+# Единица работы: одна сессия и транзакция на запрос. DAO только выполняют flush,
+# commit происходит один раз после успешного обработчика, при ошибке все изменения откатываются.
+# Подключается как Depends(get_db_session, scope="function"): commit выполняется до отправки ответа,
+# и клиент не получает 2xx для изменений, которые затем не удалось зафиксировать
 async def get_db_session() -> AsyncSession:
     async with async_session_maker() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+# Сессия для GET-запросов, которые только читают данные
+async def get_read_session(request: Request) -> AsyncSession:
+    async with read_session_maker(request)() as session:
         yield session
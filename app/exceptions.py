@@ -15,6 +15,9 @@ TokenNoFound = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
 NoJwtException = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                detail='Токен не валидный!')
 
+TokenRevokedException = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                      detail='Токен отозван')
+
 NoUserIdException = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                   detail='Не найден ID пользователя')
 
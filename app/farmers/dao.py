@@ -1,20 +1,192 @@
+from sqlalchemy import func, tuple_, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.future import select
 from fastapi import HTTPException
 
 from app.dao.base import BaseDAO
-from app.farmers.models import Farmer
+from app.farmers.models import Farmer, FarmerSummary
+from app.fields.models import Field
 
 
 class FarmerDAO(BaseDAO):
     model = Farmer
+    upsert_key = ('email',)
+
+    @classmethod
+    def list_options(cls) -> tuple:
+        return (selectinload(cls.model.fields),)
+
+    @classmethod
+    async def on_inserted(cls, session: AsyncSession, ids: set) -> None:
+        # Новому фермеру сразу нужна (пустая) сводка, иначе проверка согласованности считает ее пропавшей
+        await FarmerSummaryDAO.refresh(session, ids)
+
+    @classmethod
+    def search_options(cls) -> tuple:
+        return cls.list_options()
+
+    @classmethod
+    def _with_stats_query(cls, limit: int | None = None, after_id: int | None = None, **filter_by):
+        query = select(cls.model, FarmerSummary).outerjoin(FarmerSummary)
+        if filter_by:
+            query = query.filter_by(**filter_by)
+        return cls._paginate(query, limit=limit, after_id=after_id)
+
+    @classmethod
+    def _farmer_with_stats(cls, farmer: Farmer, summary: FarmerSummary | None) -> dict:
+        farmer_data = {column.key: getattr(farmer, column.key) for column in cls.model.__table__.columns}
+        if summary:
+            farmer_data.update(summary.to_dict())
+            # Карточка меняется и при изменении фермера, и при изменении его полей
+            farmer_data['updated_at'] = max(farmer.updated_at, summary.updated_at)
+        else:
+            farmer_data.update(number_of_fields=0, total_area_hectares=0.0, crop_mix={})
+        return farmer_data
+
+    @classmethod
+    async def find_all_with_stats(cls, session: AsyncSession, limit: int | None = None,
+                                  after_id: int | None = None, **filter_by) -> list[dict]:
+        """Фермеры с количеством и площадью полей из сводной таблицы, без загрузки самих полей."""
+        result = await session.execute(cls._with_stats_query(limit=limit, after_id=after_id, **filter_by))
+        return [cls._farmer_with_stats(farmer, summary) for farmer, summary in result.all()]
+
+    @classmethod
+    async def stream_all_with_stats(cls, session: AsyncSession, limit: int | None = None,
+                                    after_id: int | None = None, **filter_by):
+        result = await session.stream(cls._with_stats_query(limit=limit, after_id=after_id, **filter_by))
+        async for farmer, summary in result:
+            yield cls._farmer_with_stats(farmer, summary)
+
+    @classmethod
+    async def get_stats(cls, session: AsyncSession, **filter_by) -> dict:
+        """Сводка по полям одним запросом GROUP BY GROUPING SETS: итог, по севообороту и по технологии."""
+        query = (
+            select(
+                func.grouping(Field.crop_rotation).label('by_crop_rotation'),
+                func.grouping(Field.cultivation_technology).label('by_technology'),
+                Field.crop_rotation,
+                Field.cultivation_technology,
+                func.count(Field.farmer_id.distinct()).label('farmers'),
+                func.count(Field.id).label('fields'),
+                func.coalesce(func.sum(Field.area_hectares), 0.0).label('total_area_hectares'),
+            )
+            .where(*(getattr(Field, key) == value for key, value in filter_by.items()))
+            .group_by(func.grouping_sets(tuple_(), Field.crop_rotation, Field.cultivation_technology))
+        )
+        result = await session.execute(query)
+
+        stats = {
+            'total': {'farmers': 0, 'fields': 0, 'total_area_hectares': 0.0},
+            'by_crop_rotation': [],
+            'by_cultivation_technology': [],
+        }
+        for row in result.all():
+            totals = {'farmers': row.farmers, 'fields': row.fields, 'total_area_hectares': row.total_area_hectares}
+            # grouping() = 1 для колонки, не входящей в текущий набор группировки
+            if row.by_crop_rotation and row.by_technology:
+                stats['total'] = totals
+            elif not row.by_crop_rotation:
+                stats['by_crop_rotation'].append({'crop_rotation': row.crop_rotation, **totals})
+            else:
+                stats['by_cultivation_technology'].append(
+                    {'cultivation_technology': row.cultivation_technology, **totals})
+        return stats
 
     @classmethod
     async def find_full_data(cls, session: AsyncSession, farmer_id: int):
-        query = select(cls.model).options(joinedload(cls.model.fields)).filter_by(id=farmer_id)
+        query = (select(cls.model)
+                 .options(joinedload(cls.model.fields), joinedload(cls.model.summary))
+                 .filter_by(id=farmer_id))
         result = await session.execute(query)
         farmer_info = result.unique().scalar_one_or_none()
         if not farmer_info:
             raise HTTPException(status_code=404, detail="Farmer not found")
-        return farmer_info.to_dict()
\ No newline at end of file
+        farmer_data = farmer_info.to_dict()
+        if farmer_info.summary:
+            farmer_data.update(farmer_info.summary.to_dict())
+        # Версия карточки для ETag: последнее изменение фермера, его полей или сводки
+        farmer_data['updated_at'] = max(
+            [farmer_info.updated_at, *(field.updated_at for field in farmer_info.fields)]
+            + ([farmer_info.summary.updated_at] if farmer_info.summary else [])
+        )
+        return farmer_data
+
+
+class FarmerSummaryDAO(BaseDAO):
+    model = FarmerSummary
+
+    @classmethod
+    def _summary_query(cls, farmer_ids: set | None = None):
+        """Агрегаты по полям фермеров, посчитанные заново из таблицы fields."""
+        crop_rotation = func.coalesce(Field.crop_rotation, literal_column("''"))
+        per_crop = select(
+            Field.farmer_id,
+            crop_rotation.label('crop_rotation'),
+            func.count(Field.id).label('fields_count'),
+            func.sum(Field.area_hectares).label('area'),
+        ).group_by(Field.farmer_id, crop_rotation)
+        if farmer_ids is not None:
+            per_crop = per_crop.where(Field.farmer_id.in_(farmer_ids))
+        per_crop = per_crop.subquery()
+
+        crop_mix = func.jsonb_object_agg(per_crop.c.crop_rotation, per_crop.c.fields_count).filter(
+            per_crop.c.farmer_id.isnot(None))
+        query = (
+            select(
+                Farmer.id.label('farmer_id'),
+                func.coalesce(func.sum(per_crop.c.fields_count), 0).label('fields_count'),
+                func.coalesce(func.sum(per_crop.c.area), 0.0).label('total_area_hectares'),
+                func.coalesce(crop_mix, literal_column("'{}'::jsonb")).label('crop_mix'),
+            )
+            .select_from(Farmer)
+            .outerjoin(per_crop, per_crop.c.farmer_id == Farmer.id)
+            .group_by(Farmer.id)
+        )
+        if farmer_ids is not None:
+            query = query.where(Farmer.id.in_(farmer_ids))
+        return query
+
+    @classmethod
+    async def refresh(cls, session: AsyncSession, farmer_ids: set | None = None) -> None:
+        """Пересчитывает сводку только для указанных фермеров (None — для всех). Не делает commit."""
+        if farmer_ids is not None:
+            farmer_ids = {farmer_id for farmer_id in farmer_ids if farmer_id is not None}
+            if not farmer_ids:
+                return
+        columns = ['farmer_id', 'fields_count', 'total_area_hectares', 'crop_mix']
+        stmt = insert(FarmerSummary).from_select(columns, cls._summary_query(farmer_ids))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['farmer_id'],
+            set_={column: getattr(stmt.excluded, column) for column in columns[1:]} | {'updated_at': func.now()},
+        )
+        await session.execute(stmt)
+
+    @classmethod
+    async def rebuild(cls, session: AsyncSession) -> None:
+        """Полная перестройка сводки — исправляет расхождения, накопленные в обход DAO."""
+        await cls.refresh(session)
+        cls.invalidate_cache_on_commit(session)
+
+    @classmethod
+    async def find_inconsistent(cls, session: AsyncSession) -> list[dict]:
+        """Фермеры, у которых сохраненная сводка не совпадает с пересчитанной."""
+        expected = {row.farmer_id: row for row in (await session.execute(cls._summary_query())).all()}
+        stored = {row.farmer_id: row for row in (await session.execute(select(FarmerSummary))).scalars().all()}
+
+        problems = []
+        for farmer_id in expected.keys() | stored.keys():
+            actual, fresh = stored.get(farmer_id), expected.get(farmer_id)
+            if (actual is None or fresh is None
+                    or actual.fields_count != fresh.fields_count
+                    or abs(actual.total_area_hectares - fresh.total_area_hectares) > 1e-6
+                    or actual.crop_mix != fresh.crop_mix):
+                problems.append({
+                    "farmer_id": farmer_id,
+                    "stored": actual.to_dict() if actual else None,
+                    "expected": {"number_of_fields": fresh.fields_count,
+                                 "total_area_hectares": fresh.total_area_hectares,
+                                 "crop_mix": fresh.crop_mix} if fresh else None,
+                })
+        return problems
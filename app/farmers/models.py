@@ -1,5 +1,6 @@
 from app.database import Base, str_uniq, int_pk, str_null_true
-from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, Index, Computed, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import date
 import json
@@ -9,6 +10,14 @@ import json
 
 # Модель Фермера
 class Farmer(Base):
+    __table_args__ = (
+        Index('ix_farmers_search_text', 'search_text', postgresql_using='gin',
+              postgresql_ops={'search_text': 'gin_trgm_ops'}),
+        # Фильтры RBFarmer с постраничной выборкой по id
+        Index('ix_farmers_last_name_id', 'last_name', 'id'),
+        Index('ix_farmers_first_name_id', 'first_name', 'id'),
+    )
+
     id: Mapped[int_pk]
     phone_number: Mapped[str_uniq]
     first_name: Mapped[str]
@@ -19,9 +28,14 @@ class Farmer(Base):
 
     address: Mapped[str] = mapped_column(Text, nullable=False)
     photo: Mapped[str] = mapped_column(Text, nullable=True)
+    # Текст для нечеткого поиска (триграммный индекс pg_trgm), вычисляется в БД
+    search_text: Mapped[str] = mapped_column(
+        Text, Computed("last_name || ' ' || first_name || ' ' || farm_name", persisted=True))
 
     # Отношение с полями
     fields: Mapped[list["Field"]] = relationship("Field", back_populates="farmer", cascade="all, delete-orphan")
+    # Сводка по полям, поддерживается FarmerSummaryDAO
+    summary: Mapped["FarmerSummary"] = relationship("FarmerSummary", uselist=False, viewonly=True)
 
     @property
     def number_of_fields(self) -> int:
@@ -55,6 +69,24 @@ class Farmer(Base):
         }
 
 
+# Сводка по полям фермера; обновляется при каждом изменении полей в той же транзакции
+class FarmerSummary(Base):
+    __tablename__ = "farmer_summaries"
+
+    farmer_id: Mapped[int] = mapped_column(ForeignKey("farmers.id", ondelete="CASCADE"), primary_key=True)
+    fields_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    total_area_hectares: Mapped[float] = mapped_column(Float, nullable=False, server_default=text("0"))
+    # Количество полей по севооборотам: {"Пшеница - Горох": 3, "": 1}, пустой ключ — севооборот не указан
+    crop_mix: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+
+    def to_dict(self):
+        return {
+            "number_of_fields": self.fields_count,
+            "total_area_hectares": self.total_area_hectares,
+            "crop_mix": self.crop_mix
+        }
+
+
 # # Модель Поля
 # class Field(Base):
 #     id: Mapped[int_pk]
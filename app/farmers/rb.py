@@ -11,3 +11,22 @@ class RBFarmer:
         # Создаем копию словаря, чтобы избежать изменения словаря во время итерации
         filtered_data = {key: value for key, value in data.items() if value is not None}
         return filtered_data
+
+
+class RBFarmerStats:
+    def __init__(self, farmer_id: int | None = None,
+                 crop_rotation: str | None = None,
+                 cultivation_technology: str | None = None):
+        self.farmer_id = farmer_id
+        self.crop_rotation = crop_rotation
+        self.cultivation_technology = cultivation_technology
+
+    def to_dict(self) -> dict:
+        data = {
+            'farmer_id': self.farmer_id,
+            'crop_rotation': self.crop_rotation,
+            'cultivation_technology': self.cultivation_technology
+        }
+        # Фильтрация полей со значением None
+        filtered_data = {key: value for key, value in data.items() if value is not None}
+        return filtered_data
@@ -1,38 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db_session
+from app.bulk import parse_ndjson, bulk_report
+from app.dao.base import SEARCH_MIN_LENGTH
+from app.database import get_db_session, get_read_session, read_session_maker
+from app.http_cache import (get_cached_response, cache_response, cache_generation, make_etag, is_not_modified,
+                             not_modified_response)
 from app.farmers.dao import FarmerDAO
-from app.farmers.rb import RBFarmer
+from app.farmers.rb import RBFarmer, RBFarmerStats
 from app.farmers.schemas import SFarmer, SFarmerAdd, SFarmerUpdDesc
+from app.serialization import json_list_response
+from app.streaming import ndjson_response
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix='/farmers', tags=['Работа с фермерами'])
 
 
+async def _stream_farmers(session_maker, limit: int | None, after_id: int | None, filter_by: dict):
+    # Сессия открывается внутри генератора: зависимость get_db_session закрывается до отправки тела ответа
+    async with session_maker() as session:
+        async for farmer in FarmerDAO.stream_all(session, limit=limit, after_id=after_id, **filter_by):
+            yield farmer
+
+
 @router.get("/", summary="Получить всех фермеров")
 async def get_all_farmers(
+    request: Request,
     request_body: RBFarmer = Depends(),
-    session: AsyncSession = Depends(get_db_session)
+    limit: int | None = Query(None, ge=1, le=1000, description="Размер страницы"),
+    after_id: int | None = Query(None, description="ID последнего фермера с предыдущей страницы"),
+    stream: bool = Query(False, description="Отдавать фермеров потоком в формате NDJSON"),
+    include_stats: bool = Query(False, description="Добавить количество и площадь полей без загрузки списка полей"),
+    session: AsyncSession = Depends(get_read_session)
 ) -> list[SFarmer]:
-    return await FarmerDAO.find_all(session, **request_body.to_dict())
+    if stream:
+        return ndjson_response(_stream_farmers(read_session_maker(request), limit, after_id, request_body.to_dict()),
+                               SFarmer)
+    if include_stats:
+        farmers = await FarmerDAO.find_all_with_stats(session, limit=limit, after_id=after_id, **request_body.to_dict())
+    else:
+        farmers = await FarmerDAO.find_all(session, limit=limit, after_id=after_id, **request_body.to_dict())
+    return json_list_response(farmers, SFarmer)
+
+
+@router.get("/search", summary="Найти фермеров по фамилии, имени или названию хозяйства")
+async def search_farmers(
+    q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100, description="Строка поиска, допускаются опечатки"),
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Сколько результатов пропустить"),
+    session: AsyncSession = Depends(get_read_session)
+) -> list[SFarmer]:
+    farmers = await FarmerDAO.search(session, q, limit=limit, offset=offset)
+    return json_list_response(farmers, SFarmer)
+
+
+@router.get("/stats", summary="Получить сводную статистику по полям фермеров")
+async def get_farmers_stats(
+    request_body: RBFarmerStats = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+) -> dict:
+    return await FarmerDAO.get_stats(session, **request_body.to_dict())
 
 
 @router.get("/{farmer_id}", summary="Получить одного фермера по id")
 async def get_farmer_by_id(
     farmer_id: int,
-    session: AsyncSession = Depends(get_db_session)
+    request: Request,
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> SFarmer | dict:
+    cache_key = ('farmer', farmer_id)
+    cached = get_cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    tables = ('farmers', 'fields', 'farmer_summaries')
+    generation = cache_generation(tables)
     rez = await FarmerDAO.find_full_data(session, farmer_id)
     if rez is None:
         return {'message': f'Farmer с ID {farmer_id} не найден!'}
-    return rez
+    etag = make_etag(cache_key, rez['updated_at'])
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    body = SFarmer.model_validate(rez).model_dump_json().encode()
+    return cache_response(request, cache_key, etag, body, 'application/json', tables, generation)
 
 
 @router.get("/by_filter", summary="Получить одного фермера по фильтру")
 async def get_farmer_by_filter(
     request_body: RBFarmer = Depends(),
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_read_session)
 ) -> SFarmer | dict:
     rez = await FarmerDAO.find_one_or_none(session, **request_body.to_dict())
     if rez is None:
@@ -43,7 +99,7 @@ async def get_farmer_by_filter(
 @router.post("/add/", summary="Добавить фермера")
 async def register_farmer(
     farmer: SFarmerAdd,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> dict:
     try:
         await FarmerDAO.add(session, **farmer.dict())
@@ -59,10 +115,32 @@ async def register_farmer(
         raise HTTPException(status_code=500, detail="Непредвиденная ошибка сервера.")
 
 
+@router.post("/bulk/", summary="Добавить фермеров пакетом")
+async def register_farmers_bulk(
+    farmers: list[SFarmerAdd],
+    upsert: bool = Query(False, description="Обновлять существующих фермеров с тем же email"),
+    session: AsyncSession = Depends(get_db_session, scope="function")
+) -> dict:
+    rows = [farmer.model_dump() for farmer in farmers]
+    bulk = FarmerDAO.bulk_upsert if upsert else FarmerDAO.bulk_add
+    return bulk_report(await bulk(session, rows))
+
+
+@router.post("/bulk/ndjson/", summary="Добавить фермеров пакетом из NDJSON-потока")
+async def register_farmers_bulk_ndjson(
+    request: Request,
+    upsert: bool = Query(False, description="Обновлять существующих фермеров с тем же email"),
+    session: AsyncSession = Depends(get_db_session, scope="function")
+) -> dict:
+    rows, positions, errors = await parse_ndjson(request, SFarmerAdd)
+    bulk = FarmerDAO.bulk_upsert if upsert else FarmerDAO.bulk_add
+    return bulk_report(await bulk(session, rows), positions, errors)
+
+
 @router.put("/update_description/", summary='Обновить информацию о фермере')
 async def update_farmer_description(
     farmer: SFarmerUpdDesc,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> dict:
     update_data = farmer.dict(exclude_unset=True)
     filter_by = {
@@ -81,7 +159,7 @@ async def update_farmer_description(
 @router.delete("/delete/{farmer_id}", summary='Удалить информацию о фермере')
 async def delete_farmer(
     farmer_id: int,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> dict:
     check = await FarmerDAO.delete(session, id=farmer_id)
     if check:
@@ -10,22 +10,24 @@ class SFarmerBase(BaseModel):
     phone_number: str = Field(..., max_length=15, description="Номер телефона в международном формате, начинающийся с '+'")
     first_name: str = Field(..., min_length=1, max_length=50, description="Имя фермера, от 1 до 50 символов")
     last_name: str = Field(..., min_length=1, max_length=50, description="Фамилия фермера, от 1 до 50 символов")
+    farm_name: str = Field(..., min_length=1, max_length=100, description="Название хозяйства, от 1 до 100 символов")
     date_of_birth: date = Field(..., description="Дата рождения фермера в формате ГГГГ-ММ-ДД")
     email: EmailStr = Field(..., description="Электронная почта фермера")
     address: str = Field(..., min_length=10, max_length=200, description="Адрес фермера, не более 200 символов")
     photo: Optional[str] = Field(None, max_length=100, description="Фото фермера")
 
-    @field_validator("phone_number", mode="before")
+    @field_validator("phone_number")
     @classmethod
     def validate_phone_number(cls, value):
-        if not re.match(r'^\+\d{1,15}$', value):
+        if value is not None and not re.match(r'^\+\d{1,15}$', value):
             raise ValueError('Номер телефона должен начинаться с "+" и содержать от 1 до 15 цифр')
         return value
 
-    @field_validator("date_of_birth", mode="before")
+    # Проверка после разбора: из JSON дата приходит строкой
+    @field_validator("date_of_birth")
     @classmethod
     def validate_date_of_birth(cls, value):
-        if value >= date.today():
+        if value is not None and value >= date.today():
             raise ValueError('Дата рождения должна быть в прошлом')
         return value
 
@@ -34,16 +36,9 @@ class SFarmer(SFarmerBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
     fields: List[SField] = Field(default_factory=list, description="Список полей")
-
-    @property
-    def number_of_fields(self) -> int:
-        """Возвращает количество полей у фермера."""
-        return len(self.fields)
-
-    @property
-    def total_area_hectares(self) -> float:
-        """Возвращает общую площадь всех полей в гектарах."""
-        return sum(field.area_hectares for field in self.fields)
+    number_of_fields: Optional[int] = Field(None, description="Количество полей у фермера")
+    total_area_hectares: Optional[float] = Field(None, description="Общая площадь всех полей в гектарах")
+    crop_mix: Optional[dict[str, int]] = Field(None, description="Количество полей по севооборотам")
 
 
 class SFarmerAdd(SFarmerBase):
@@ -53,6 +48,7 @@ class SFarmerAdd(SFarmerBase):
                 "phone_number": "+79261234567",
                 "first_name": "Иван",
                 "last_name": "Иванов",
+                "farm_name": "КФХ Иванова",
                 "date_of_birth": "1980-05-10",
                 "email": "ivan.ivanov@example.com",
                 "address": "Тульская область, Россия",
@@ -65,6 +61,7 @@ class SFarmerUpdDesc(SFarmerBase):
     phone_number: Optional[str] = Field(None, max_length=15, description="Номер телефона в международном формате, начинающийся с '+'")
     first_name: Optional[str] = Field(None, min_length=1, max_length=50, description="Имя фермера, от 1 до 50 символов")
     last_name: Optional[str] = Field(None, min_length=1, max_length=50, description="Фамилия фермера, от 1 до 50 символов")
+    farm_name: Optional[str] = Field(None, min_length=1, max_length=100, description="Название хозяйства, от 1 до 100 символов")
     date_of_birth: Optional[date] = Field(None, description="Дата рождения фермера в формате ГГГГ-ММ-ДД")
     email: Optional[EmailStr] = Field(None, description="Электронная почта фермера")
     address: Optional[str] = Field(None, min_length=10, max_length=200, description="Адрес фермера, не более 200 символов")
@@ -0,0 +1,32 @@
+"""Обслуживание сводной таблицы farmer_summaries.
+
+    python -m app.farmers.summary check    — показать фермеров с расхождениями
+    python -m app.farmers.summary rebuild  — пересчитать сводку для всех фермеров
+"""
+import argparse
+import asyncio
+import json
+
+from app.database import async_session_maker
+from app.farmers.dao import FarmerSummaryDAO
+import app.fields.models  # noqa: F401  регистрирует модель Field для связей Farmer
+
+
+async def main(command: str) -> int:
+    async with async_session_maker() as session:
+        if command == "rebuild":
+            await FarmerSummaryDAO.rebuild(session)
+            await session.commit()
+            print("Сводка фермеров перестроена")
+            return 0
+        problems = await FarmerSummaryDAO.find_inconsistent(session)
+        for problem in problems:
+            print(json.dumps(problem, ensure_ascii=False))
+        print(f"Фермеров с расхождениями: {len(problems)}")
+        return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сводная таблица полей фермеров")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    raise SystemExit(asyncio.run(main(parser.parse_args().command)))
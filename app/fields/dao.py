@@ -1,3 +1,4 @@
+from sqlalchemy import func, inspect, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from sqlalchemy.future import select
@@ -5,26 +6,151 @@ from fastapi import HTTPException
 
 
 from app.dao.base import BaseDAO
+from app.config import settings
+from app.fields.geometry import parse_coordinates, geometry_columns
 from app.fields.models import Field
+from app.farmers.dao import FarmerSummaryDAO
 from app.farmers.models import Farmer
 
 
 class FieldsDAO(BaseDAO):
     model = Field
+    upsert_key = ('name',)
 
     @classmethod
-    async def find_fields(cls, session: AsyncSession, **field_data):
-        query = select(cls.model).options(joinedload(cls.model.farmer)).filter_by(**field_data)
+    def changed_keys(cls, entities: list) -> set:
+        # Фермеры, чью сводку нужно пересчитать, включая прежнего владельца при смене farmer_id
+        farmer_ids = set()
+        for field in entities:
+            farmer_ids.add(field.farmer_id)
+            farmer_ids.update(inspect(field).attrs.farmer_id.history.deleted)
+        return farmer_ids
+
+    @classmethod
+    async def bulk_changed_keys(cls, session: AsyncSession, rows: list[dict]) -> set:
+        farmer_ids = {row.get('farmer_id') for row in rows}
+        # При upsert существующее поле может перейти к другому фермеру
+        names = [row['name'] for row in rows if row.get('name')]
+        previous = await session.execute(select(cls.model.farmer_id).where(cls.model.name.in_(names)).distinct())
+        return farmer_ids | set(previous.scalars().all())
+
+    @classmethod
+    async def on_changed(cls, session: AsyncSession, keys: set) -> None:
+        await FarmerSummaryDAO.refresh(session, keys)
+
+    @classmethod
+    def prepare_rows(cls, rows: list[dict]) -> list[dict]:
+        polygons = [parse_coordinates(row.get('coordinates')) for row in rows]
+        return [
+            {**row, 'geom': points or None, **columns}
+            for row, points, columns in zip(rows, polygons, geometry_columns(polygons))
+        ]
+
+    @classmethod
+    async def recompute_geometry(cls, session: AsyncSession, batch_size: int = 5000) -> int:
+        """Пересчитывает площадь, периметр и центр всех полей пачками; возвращает число полей."""
+        total = 0
+        after_id = 0
+        while True:
+            query = (select(cls.model.id, cls.model.coordinates)
+                     .where(cls.model.id > after_id).order_by(cls.model.id).limit(batch_size))
+            rows = (await session.execute(query)).all()
+            if not rows:
+                break
+            polygons = [parse_coordinates(coordinates) for _, coordinates in rows]
+            values = [
+                {'id': field_id, 'geom': points or None, **columns}
+                for (field_id, _), points, columns in zip(rows, polygons, geometry_columns(polygons))
+            ]
+            await session.execute(update(cls.model), values)
+            total += len(rows)
+            after_id = rows[-1].id
+        cls.invalidate_cache_on_commit(session)
+        return total
+
+    @classmethod
+    async def find_area_mismatches(cls, session: AsyncSession, tolerance: float | None = None):
+        """Поля, у которых указанная площадь отличается от вычисленной по контуру."""
+        tolerance = settings.FIELD_AREA_TOLERANCE if tolerance is None else tolerance
+        computed = cls.model.computed_area_hectares
+        query = cls._fields_query().where(
+            computed > 0,
+            func.abs(cls.model.area_hectares - computed) / computed > tolerance,
+        )
         result = await session.execute(query)
-        fields_info = result.scalars().all()
+        return result.scalars().all()
+
+    @classmethod
+    def list_options(cls) -> tuple:
+        return (joinedload(cls.model.farmer),)
 
-        fields_data = []
-        for field in fields_info:
-            field_dict = field.to_dict()
-            field_dict['farmer'] = field.farmer.last_name if field.farmer else None
-            fields_data.append(field_dict)
+    @classmethod
+    def _fields_query(cls, limit: int | None = None, after_id: int | None = None, **field_data):
+        """Поля без фермера: для ответов API по схеме SField, где он не нужен."""
+        return cls._paginate(select(cls.model).filter_by(**field_data), limit=limit, after_id=after_id)
+
+    @classmethod
+    async def find_fields(cls, session: AsyncSession, limit: int | None = None, after_id: int | None = None,
+                          **field_data):
+        result = await session.execute(cls._fields_query(limit=limit, after_id=after_id, **field_data))
+        return result.scalars().all()
+
+    @classmethod
+    async def stream_fields(cls, session: AsyncSession, limit: int | None = None, after_id: int | None = None,
+                            **field_data):
+        async for field in cls.stream_all(session, limit=limit, after_id=after_id, **field_data):
+            yield cls._field_with_farmer(field)
+
+    @classmethod
+    async def find_in_bbox(cls, session: AsyncSession, min_lat: float, min_lon: float,
+                           max_lat: float, max_lon: float, limit: int | None = None, after_id: int | None = None):
+        """Поля, контур которых пересекается с прямоугольником (использует GiST-индекс по geom)."""
+        bbox = func.polygon(func.box(func.point(min_lon, min_lat), func.point(max_lon, max_lat)))
+        query = cls._fields_query(limit=limit, after_id=after_id).where(cls.model.geom.op('&&')(bbox))
+        result = await session.execute(query)
+        return result.scalars().all()
+
+    @classmethod
+    def _geometry_query(cls, bbox: tuple[float, float, float, float] | None = None):
+        """Только колонки, нужные для карты, без загрузки ORM-объектов."""
+        model = cls.model
+        query = select(model.id, model.name, model.farmer_id, model.area_hectares, model.crop_rotation,
+                       model.geom, model.centroid_lat, model.centroid_lon).where(model.geom.isnot(None))
+        if bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            box = func.polygon(func.box(func.point(min_lon, min_lat), func.point(max_lon, max_lat)))
+            query = query.where(model.geom.op('&&')(box))
+        return query.order_by(model.id)
+
+    @classmethod
+    async def find_geometries(cls, session: AsyncSession, bbox: tuple[float, float, float, float] | None = None):
+        result = await session.execute(cls._geometry_query(bbox))
+        return result.all()
+
+    @classmethod
+    async def stream_geometries(cls, session: AsyncSession, bbox: tuple[float, float, float, float] | None = None):
+        result = await session.stream(cls._geometry_query(bbox))
+        async for row in result:
+            yield row
+
+    @classmethod
+    async def find_containing_point(cls, session: AsyncSession, lat: float, lon: float):
+        """Поля, внутри контура которых находится точка."""
+        point = func.point(lon, lat)
+        # && по вырожденному прямоугольнику отбирает кандидатов по индексу, @> проверяет точное попадание
+        query = cls._fields_query().where(
+            cls.model.geom.op('&&')(func.polygon(func.box(point, point))),
+            cls.model.geom.op('@>')(point),
+        )
+        result = await session.execute(query)
+        return result.scalars().all()
 
-        return fields_data
+    @staticmethod
+    def _field_with_farmer(field: Field) -> dict:
+        field_dict = field.to_dict()
+        field_dict['farmer'] = field.farmer.last_name if field.farmer else None
+        field_dict['updated_at'] = field.updated_at
+        return field_dict
 
     @classmethod
     async def find_full_data(cls, session: AsyncSession, field_id: int):
@@ -37,4 +163,6 @@ class FieldsDAO(BaseDAO):
 
         field_data = field_info.to_dict()
         field_data['farmer'] = field_info.farmer.last_name
+        # Версия карточки для ETag: в ответ входит фамилия фермера
+        field_data['updated_at'] = max(field_info.updated_at, field_info.farmer.updated_at)
         return field_data
\ No newline at end of file
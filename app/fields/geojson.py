@@ -0,0 +1,66 @@
+import json
+from typing import AsyncIterator, Iterable
+
+from app.fields.geometry import simplify_polygons, zoom_tolerance
+
+GEOJSON_MEDIA_TYPE = 'application/geo+json'
+STREAM_BATCH_SIZE = 500
+
+
+def build_features(rows: list, zoom: int | None) -> list[dict]:
+    """GeoJSON-объекты для строк FieldsDAO.geometry_columns().
+
+    Контуры упрощаются под масштаб; поле меньше пикселя отдается точкой в его центре.
+    """
+    polygons = [row.geom or [] for row in rows]
+    if zoom is not None:
+        polygons = simplify_polygons(polygons, zoom_tolerance(zoom))
+
+    features = []
+    for row, outline in zip(rows, polygons):
+        if len(outline) >= 3:
+            ring = [[lon, lat] for lat, lon in outline]
+            geometry = {'type': 'Polygon', 'coordinates': [ring + [ring[0]]]}
+        elif row.centroid_lat is not None:
+            geometry = {'type': 'Point', 'coordinates': [row.centroid_lon, row.centroid_lat]}
+        else:
+            continue
+        features.append({
+            'type': 'Feature',
+            'id': row.id,
+            'geometry': geometry,
+            'properties': {
+                'name': row.name,
+                'farmer_id': row.farmer_id,
+                'area_hectares': row.area_hectares,
+                'crop_rotation': row.crop_rotation,
+            },
+        })
+    return features
+
+
+def _dumps(features: Iterable[dict]) -> str:
+    return ','.join(json.dumps(feature, ensure_ascii=False, separators=(',', ':')) for feature in features)
+
+
+def feature_collection(rows: list, zoom: int | None) -> bytes:
+    return ('{"type":"FeatureCollection","features":[' + _dumps(build_features(rows, zoom)) + ']}').encode()
+
+
+async def stream_feature_collection(rows: AsyncIterator, zoom: int | None) -> AsyncIterator[bytes]:
+    """FeatureCollection по частям: строки упрощаются пачками по мере чтения из БД."""
+    yield b'{"type":"FeatureCollection","features":['
+    batch, first = [], True
+    async for row in rows:
+        batch.append(row)
+        if len(batch) < STREAM_BATCH_SIZE:
+            continue
+        chunk = _dumps(build_features(batch, zoom))
+        if chunk:
+            yield (chunk if first else ',' + chunk).encode()
+            first = False
+        batch = []
+    chunk = _dumps(build_features(batch, zoom))
+    if chunk:
+        yield (chunk if first else ',' + chunk).encode()
+    yield b']}'
@@ -0,0 +1,171 @@
+import json
+import re
+
+import numpy as np
+from sqlalchemy import Text, cast
+from sqlalchemy.types import UserDefinedType
+
+_POINT_RE = re.compile(r'^\(\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\)$')
+
+
+def parse_coordinates(coordinates: str | None) -> list[tuple[float, float]]:
+    """Разбирает координаты поля в список точек (широта, долгота).
+
+    Поддерживаются JSON-список вида [{"lat": .., "lon": ..}, ...] и одна точка "(широта, долгота)".
+    Строка другого вида или JSON другой формы дает пустой список.
+    """
+    if not coordinates:
+        return []
+    match = _POINT_RE.match(coordinates.strip())
+    if match:
+        return [(float(match.group(1)), float(match.group(2)))]
+    try:
+        return [(float(point["lat"]), float(point["lon"])) for point in json.loads(coordinates)]
+    except (TypeError, KeyError, ValueError):
+        return []
+
+
+class Polygon(UserDefinedType):
+    """Нативный тип PostgreSQL polygon; в Python — список точек (широта, долгота).
+
+    В БД точка хранится как (x=долгота, y=широта), чтобы bbox-запросы совпадали с порядком осей карты.
+    """
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "POLYGON"
+
+    def bind_expression(self, bindvalue):
+        # Контур передается текстом: при многострочной вставке (insertmanyvalues) тип параметра
+        # не выводится как polygon, и драйвер не принял бы список точек
+        return cast(cast(bindvalue, Text), self)
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if not value:
+                return None
+            return "(" + ",".join(f"({lon!r},{lat!r})" for lat, lon in value) + ")"
+        return process
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None:
+                return None
+            return [(point[1], point[0]) for point in value]
+        return process
+
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def polygon_metrics(polygons: list[list[tuple[float, float]]]) -> dict[str, np.ndarray]:
+    """Геодезические характеристики многих контуров за один векторизованный проход.
+
+    Контуры (списки точек широта/долгота) склеиваются в плоские массивы, а суммы по каждому контуру
+    считаются через np.add.reduceat. Возвращает массивы длины len(polygons): area_hectares, perimeter_m,
+    centroid_lat, centroid_lon, min_lat, min_lon, max_lat, max_lon. Для пустых контуров — NaN.
+    """
+    count = len(polygons)
+    result = {name: np.full(count, np.nan) for name in
+              ("area_hectares", "perimeter_m", "centroid_lat", "centroid_lon",
+               "min_lat", "min_lon", "max_lat", "max_lon")}
+    sizes = np.fromiter((len(polygon) for polygon in polygons), dtype=np.int64, count=count)
+    present = np.flatnonzero(sizes)
+    if not present.size:
+        return result
+
+    points = np.array([point for index in present for point in polygons[index]], dtype=np.float64)
+    lat, lon = np.radians(points[:, 0]), np.radians(points[:, 1])
+    sizes = sizes[present]
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    # Индекс следующей вершины с замыканием контура на первую
+    following = np.arange(len(points)) + 1
+    following[starts + sizes - 1] = starts
+    lat2, lon2 = lat[following], lon[following]
+    dlon = (lon2 - lon + np.pi) % (2 * np.pi) - np.pi
+
+    # Площадь сферического многоугольника (формула Chamberlain & Duquette)
+    excess = np.add.reduceat(dlon * (2 + np.sin(lat) + np.sin(lat2)), starts)
+    area_m2 = np.abs(excess) * EARTH_RADIUS_M ** 2 / 2
+    area_m2[sizes < 3] = 0.0
+
+    # Периметр — сумма расстояний по гаверсинусу
+    haversine = np.sin((lat2 - lat) / 2) ** 2 + np.cos(lat) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    edges = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
+    perimeter = np.add.reduceat(edges, starts)
+
+    # Центроид по формуле площадей в градусах; для малых полей погрешность пренебрежимо мала
+    x, y = points[:, 1], points[:, 0]
+    x2, y2 = x[following], y[following]
+    cross = x * y2 - x2 * y
+    signed = np.add.reduceat(cross, starts) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        centroid_lon = np.add.reduceat((x + x2) * cross, starts) / (6 * signed)
+        centroid_lat = np.add.reduceat((y + y2) * cross, starts) / (6 * signed)
+    degenerate = ~np.isfinite(centroid_lon) | (signed == 0)
+    centroid_lon[degenerate] = (np.add.reduceat(x, starts) / sizes)[degenerate]
+    centroid_lat[degenerate] = (np.add.reduceat(y, starts) / sizes)[degenerate]
+
+    result["area_hectares"][present] = area_m2 / 10_000
+    result["perimeter_m"][present] = perimeter
+    result["centroid_lat"][present] = centroid_lat
+    result["centroid_lon"][present] = centroid_lon
+    result["min_lat"][present] = np.minimum.reduceat(y, starts)
+    result["max_lat"][present] = np.maximum.reduceat(y, starts)
+    result["min_lon"][present] = np.minimum.reduceat(x, starts)
+    result["max_lon"][present] = np.maximum.reduceat(x, starts)
+    return result
+
+
+def geometry_columns(polygons: list[list[tuple[float, float]]]) -> list[dict]:
+    """Значения вычисляемых колонок Field для каждого контура."""
+    metrics = polygon_metrics(polygons)
+    columns = ("computed_area_hectares", "perimeter_m", "centroid_lat", "centroid_lon")
+    arrays = (metrics["area_hectares"], metrics["perimeter_m"], metrics["centroid_lat"], metrics["centroid_lon"])
+    return [
+        {column: None if np.isnan(value) else float(value) for column, value in zip(columns, values)}
+        for values in zip(*arrays)
+    ]
+
+
+def is_area_mismatch(declared: float | None, computed: float | None, tolerance: float) -> bool:
+    """Указанная вручную площадь отличается от вычисленной по контуру больше чем на tolerance (доля)."""
+    if not declared or not computed:
+        return False
+    return abs(declared - computed) / computed > tolerance
+
+
+def zoom_tolerance(zoom: int, tile_size: int = 256) -> float:
+    """Размер одного пикселя карты в градусах долготы на заданном масштабе."""
+    return 360 / (tile_size * 2 ** zoom)
+
+
+def tile_bbox(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """Границы тайла z/x/y (Web Mercator) как (min_lat, min_lon, max_lat, max_lon)."""
+    n = 2 ** z
+
+    def lat(tile_y: int) -> float:
+        return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * tile_y / n)))))
+
+    return lat(y + 1), x / n * 360 - 180, lat(y), (x + 1) / n * 360 - 180
+
+
+def simplify_polygons(polygons: list[list[tuple[float, float]]], tolerance: float) -> list[list[list[float]]]:
+    """Упрощает контуры для отображения: подряд идущие вершины из одной ячейки сетки tolerance схлопываются.
+
+    Все контуры обрабатываются одним проходом по плоскому массиву точек.
+    """
+    sizes = np.fromiter((len(polygon) for polygon in polygons), dtype=np.int64, count=len(polygons))
+    if not sizes.any():
+        return [[] for _ in polygons]
+    points = np.array([point for polygon in polygons for point in polygon], dtype=np.float64)
+    cells = np.floor(points / tolerance).astype(np.int64)
+
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+    # Первая вершина каждого контура сохраняется всегда
+    keep[starts[sizes > 0]] = True
+    return [points[start:end][keep[start:end]].tolist() for start, end in zip(starts, ends)]
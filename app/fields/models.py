@@ -1,6 +1,8 @@
 from app.database import Base, str_uniq, int_pk, str_null_true
-from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, Index, Computed
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from app.config import settings
+from app.fields.geometry import Polygon, parse_coordinates, geometry_columns, is_area_mismatch
 # from app.farmers.models import Farmer
 from datetime import date
 import json
@@ -8,12 +10,32 @@ import json
 
 # Модель Поля
 class Field(Base):
+    __table_args__ = (
+        Index('ix_fields_geom', 'geom', postgresql_using='gist'),
+        Index('ix_fields_search_text', 'search_text', postgresql_using='gin',
+              postgresql_ops={'search_text': 'gin_trgm_ops'}),
+        # Фильтры RBField с постраничной выборкой по id
+        Index('ix_fields_farmer_id_id', 'farmer_id', 'id'),
+        Index('ix_fields_crop_rotation_id', 'crop_rotation', 'id'),
+        Index('ix_fields_cultivation_technology_id', 'cultivation_technology', 'id'),
+    )
+
     id: Mapped[int_pk]
     name: Mapped[str_uniq]
     area_hectares: Mapped[float] = mapped_column(Float, nullable=False)
     crop_rotation: Mapped[str] = mapped_column(String, nullable=True)
     cultivation_technology: Mapped[str] = mapped_column(String, nullable=True)
     coordinates: Mapped[str] = mapped_column(String, nullable=True)
+    # Контур поля для пространственных запросов, заполняется из coordinates
+    geom: Mapped[list] = mapped_column(Polygon, nullable=True)
+    # Вычисляются по контуру при создании и изменении поля
+    computed_area_hectares: Mapped[float] = mapped_column(Float, nullable=True)
+    perimeter_m: Mapped[float] = mapped_column(Float, nullable=True)
+    centroid_lat: Mapped[float] = mapped_column(Float, nullable=True)
+    centroid_lon: Mapped[float] = mapped_column(Float, nullable=True)
+    # Текст для нечеткого поиска (триграммный индекс pg_trgm), вычисляется в БД
+    search_text: Mapped[str] = mapped_column(
+        Text, Computed("name || ' ' || coalesce(crop_rotation, '')", persisted=True))
 
     # Внешний ключ, связывающий поле с фермером
     farmer_id: Mapped[int] = mapped_column(ForeignKey("farmers.id"), nullable=True)
@@ -21,10 +43,23 @@ class Field(Base):
     # Связь с моделью Farmer (отношение многие-к-одному)
     farmer: Mapped["Farmer"] = relationship("Farmer", back_populates="fields")
 
+    @validates('coordinates')
+    def _sync_geom(self, key, value):
+        points = parse_coordinates(value)
+        self.geom = points or None
+        for column, computed in geometry_columns([points])[0].items():
+            setattr(self, column, computed)
+        return value
+
+    @property
+    def area_mismatch(self) -> bool:
+        """Указанная площадь расходится с площадью по контуру больше допустимого."""
+        return is_area_mismatch(self.area_hectares, self.computed_area_hectares, settings.FIELD_AREA_TOLERANCE)
+
     @property
     def parsed_coordinates(self):
         """Возвращает координаты как список точек (словарей)"""
-        return json.loads(self.coordinates) if self.coordinates else []
+        return [{"lat": lat, "lon": lon} for lat, lon in self.geom or []]
 
     def __str__(self):
         return f"{self.__class__.__name__}(id={self.id}, name={self.name!r})"
@@ -40,5 +75,10 @@ class Field(Base):
             "crop_rotation": self.crop_rotation,
             "cultivation_technology": self.cultivation_technology,
             "coordinates": self.coordinates,
-            "farmer_id": self.farmer_id
+            "farmer_id": self.farmer_id,
+            "computed_area_hectares": self.computed_area_hectares,
+            "perimeter_m": self.perimeter_m,
+            "centroid_lat": self.centroid_lat,
+            "centroid_lon": self.centroid_lon,
+            "area_mismatch": self.area_mismatch
         }
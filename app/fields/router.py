@@ -1,37 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Path
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db_session
+from app.bulk import parse_ndjson, bulk_report
+from app.dao.base import SEARCH_MIN_LENGTH
+from app.database import get_db_session, get_read_session, read_session_maker
+from app.http_cache import (get_cached_response, cache_response, cache_generation, make_etag, is_not_modified,
+                             not_modified_response)
 from app.fields.dao import FieldsDAO
+from app.fields.geojson import GEOJSON_MEDIA_TYPE, feature_collection, stream_feature_collection
+from app.fields.geometry import tile_bbox
 from app.fields.rb import RBField
 from app.fields.schemas import SField, SFieldAdd, SFieldUpdDesc
+from app.serialization import json_list_response
+from app.streaming import ndjson_response
 
 router = APIRouter(prefix='/fields', tags=['Работа с полями'])
 
 
+async def _stream_fields(session_maker, limit: int | None, after_id: int | None, field_data: dict):
+    # Сессия открывается внутри генератора: зависимость get_db_session закрывается до отправки тела ответа
+    async with session_maker() as session:
+        async for field in FieldsDAO.stream_fields(session, limit=limit, after_id=after_id, **field_data):
+            yield field
+
+
 @router.get("/", summary="Получить все поля")
 async def get_all_fields(
+    request: Request,
     request_body: RBField = Depends(),
-    session: AsyncSession = Depends(get_db_session)
+    limit: int | None = Query(None, ge=1, le=1000, description="Размер страницы"),
+    after_id: int | None = Query(None, description="ID последнего поля с предыдущей страницы"),
+    stream: bool = Query(False, description="Отдавать поля потоком в формате NDJSON"),
+    session: AsyncSession = Depends(get_read_session)
+) -> list[SField]:
+    if stream:
+        return ndjson_response(_stream_fields(read_session_maker(request), limit, after_id, request_body.to_dict()),
+                               SField)
+    fields = await FieldsDAO.find_fields(session, limit=limit, after_id=after_id, **request_body.to_dict())
+    return json_list_response(fields, SField)
+
+
+@router.get("/search", summary="Найти поля по названию или севообороту")
+async def search_fields(
+    q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100, description="Строка поиска, допускаются опечатки"),
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Сколько результатов пропустить"),
+    session: AsyncSession = Depends(get_read_session)
+) -> list[SField]:
+    return json_list_response(await FieldsDAO.search(session, q, limit=limit, offset=offset), SField)
+
+
+@router.get("/in_bbox", summary="Получить поля в прямоугольной области карты")
+async def get_fields_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int | None = Query(None, ge=1, le=1000, description="Размер страницы"),
+    after_id: int | None = Query(None, description="ID последнего поля с предыдущей страницы"),
+    session: AsyncSession = Depends(get_read_session)
+) -> list[SField]:
+    fields = await FieldsDAO.find_in_bbox(session, min_lat, min_lon, max_lat, max_lon, limit=limit, after_id=after_id)
+    return json_list_response(fields, SField)
+
+
+@router.get("/at_point", summary="Получить поля, содержащие точку")
+async def get_fields_at_point(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    session: AsyncSession = Depends(get_read_session)
+) -> list[SField]:
+    return json_list_response(await FieldsDAO.find_containing_point(session, lat, lon), SField)
+
+
+@router.get("/area_mismatches", summary="Получить поля, площадь которых не совпадает с контуром")
+async def get_area_mismatches(
+    tolerance: float | None = Query(None, gt=0, description="Допустимое относительное отклонение"),
+    session: AsyncSession = Depends(get_read_session)
 ) -> list[SField]:
-    return await FieldsDAO.find_fields(session, **request_body.to_dict())
+    return json_list_response(await FieldsDAO.find_area_mismatches(session, tolerance), SField)
+
+
+@router.post("/recompute_geometry/", summary="Пересчитать площадь и центр всех полей по контурам")
+async def recompute_fields_geometry(session: AsyncSession = Depends(get_db_session, scope="function")) -> dict:
+    total = await FieldsDAO.recompute_geometry(session)
+    return {"message": f"Пересчитано полей: {total}"}
+
+
+async def _stream_geometries(session_maker, bbox: tuple[float, float, float, float] | None):
+    async with session_maker() as session:
+        async for row in FieldsDAO.stream_geometries(session, bbox):
+            yield row
+
+
+@router.get("/geojson", summary="Получить контуры полей в формате GeoJSON")
+async def get_fields_geojson(
+    request: Request,
+    min_lat: float | None = Query(None, ge=-90, le=90),
+    min_lon: float | None = Query(None, ge=-180, le=180),
+    max_lat: float | None = Query(None, ge=-90, le=90),
+    max_lon: float | None = Query(None, ge=-180, le=180),
+    zoom: int | None = Query(None, ge=0, le=22, description="Масштаб карты для упрощения контуров"),
+):
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    if any(value is None for value in bbox):
+        bbox = None
+    return StreamingResponse(stream_feature_collection(_stream_geometries(read_session_maker(request), bbox), zoom),
+                             media_type=GEOJSON_MEDIA_TYPE)
+
+
+@router.get("/tiles/{z}/{x}/{y}.geojson", summary="Получить тайл карты полей в формате GeoJSON")
+async def get_fields_tile(
+    request: Request,
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    session: AsyncSession = Depends(get_db_session, scope="function")
+):
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail="Тайл вне сетки")
+    cache_key = ('tile', z, x, y)
+    cached = get_cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    tables = ('fields',)
+    generation = cache_generation(tables)
+    etag = make_etag(cache_key, await FieldsDAO.get_version(session))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    rows = await FieldsDAO.find_geometries(session, tile_bbox(z, x, y))
+    return cache_response(request, cache_key, etag, feature_collection(rows, z), GEOJSON_MEDIA_TYPE,
+                          tables, generation)
 
 
 @router.get("/{field_id}", summary="Получить одно поле по id")
 async def get_field_by_id(
     field_id: int,
-    session: AsyncSession = Depends(get_db_session)
+    request: Request,
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> SField | dict:
+    cache_key = ('field', field_id)
+    cached = get_cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    tables = ('fields', 'farmers')
+    generation = cache_generation(tables)
     rez = await FieldsDAO.find_full_data(session, field_id)
     if rez is None:
         return {'message': f'Поле с ID {field_id} не найдено!'}
-    return rez
+    etag = make_etag(cache_key, rez['updated_at'])
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    body = SField.model_validate(rez).model_dump_json().encode()
+    return cache_response(request, cache_key, etag, body, 'application/json', tables, generation)
 
 
 @router.get("/by_filter", summary="Получить одно поле по фильтру")
 async def get_field_by_filter(
     request_body: RBField = Depends(),
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_read_session)
 ) -> SField | dict:
     rez = await FieldsDAO.find_one_or_none(session, **request_body.to_dict())
     if rez is None:
@@ -42,7 +172,7 @@ async def get_field_by_filter(
 @router.post("/add/", summary='Добавить информацию поле')
 async def register_field(
     field: SFieldAdd,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> dict:
     check = await FieldsDAO.add_field(session, field_data=field.dict())
     if check:
@@ -51,10 +181,32 @@ async def register_field(
         return {"message": "Ошибка при добавлении поля!"}
 
 
+@router.post("/bulk/", summary="Добавить поля пакетом")
+async def register_fields_bulk(
+    fields: list[SFieldAdd],
+    upsert: bool = Query(False, description="Обновлять существующие поля с тем же названием"),
+    session: AsyncSession = Depends(get_db_session, scope="function")
+) -> dict:
+    rows = [field.model_dump() for field in fields]
+    bulk = FieldsDAO.bulk_upsert if upsert else FieldsDAO.bulk_add
+    return bulk_report(await bulk(session, rows))
+
+
+@router.post("/bulk/ndjson/", summary="Добавить поля пакетом из NDJSON-потока")
+async def register_fields_bulk_ndjson(
+    request: Request,
+    upsert: bool = Query(False, description="Обновлять существующие поля с тем же названием"),
+    session: AsyncSession = Depends(get_db_session, scope="function")
+) -> dict:
+    rows, positions, errors = await parse_ndjson(request, SFieldAdd)
+    bulk = FieldsDAO.bulk_upsert if upsert else FieldsDAO.bulk_add
+    return bulk_report(await bulk(session, rows), positions, errors)
+
+
 @router.delete("/delete/{field_id}", summary='Удалить информацию о поле')
 async def dell_field_by_id(
     field_id: int,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> dict:
     check = await FieldsDAO.delete_field_by_id(session, field_id)
     if check:
@@ -67,7 +219,7 @@ async def dell_field_by_id(
 async def update_field_description(
     field_id: int,
     field_data: SFieldUpdDesc,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> dict:
     update_data = field_data.dict(exclude_unset=True)
 
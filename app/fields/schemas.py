@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from pydantic import BaseModel, Field, ConfigDict, ValidationInfo, field_validator
 from typing import Optional
-import re
+
+from app.fields.geometry import parse_coordinates
 
 
 class SFieldBase(BaseModel):
@@ -8,7 +9,8 @@ class SFieldBase(BaseModel):
     area_hectares: float = Field(..., gt=0, description="Площадь поля в гектарах, должна быть больше 0")
     crop_rotation: Optional[str] = Field(None, max_length=100, description="Информация о севообороте, не более 100 символов")
     cultivation_technology: Optional[str] = Field(None, max_length=100, description="Технология возделывания, не более 100 символов")
-    coordinates: Optional[str] = Field(..., description="Координаты поля в формате (широта, долгота)")
+    coordinates: Optional[str] = Field(..., description='Координаты поля: точка "(широта, долгота)" '
+                                       'или JSON-список контура [{"lat": широта, "lon": долгота}, ...]')
     farmer_id: int = Field(..., description="ID фермера, к которому относится поле")
 
     @field_validator('area_hectares')
@@ -18,15 +20,24 @@ class SFieldBase(BaseModel):
         return value
 
     @field_validator('coordinates')
-    def validate_coordinates(cls, value):
-        if value and not re.match(r'^\(\-?\d+(\.\d+)?,\s*\-?\d+(\.\d+)?\)$', value):
-            raise ValueError('Координаты должны быть в формате (широта, долгота)')
+    def validate_coordinates(cls, value, info: ValidationInfo):
+        # Данные из БД проверены при записи, при сериализации ответа разбор не повторяется
+        if not value or (info.context or {}).get('from_db'):
+            return value
+        if not parse_coordinates(value):
+            raise ValueError('Координаты должны быть в формате (широта, долгота) '
+                             'или списком [{"lat": широта, "lon": долгота}, ...]')
         return value
 
 
 class SField(SFieldBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
+    computed_area_hectares: Optional[float] = Field(None, description="Площадь по контуру в гектарах")
+    perimeter_m: Optional[float] = Field(None, description="Периметр контура в метрах")
+    centroid_lat: Optional[float] = Field(None, description="Широта центра поля")
+    centroid_lon: Optional[float] = Field(None, description="Долгота центра поля")
+    area_mismatch: bool = Field(False, description="Указанная площадь расходится с площадью по контуру")
 
 
 class SFieldAdd(SFieldBase):
@@ -48,5 +59,6 @@ class SFieldUpdDesc(SFieldBase):
     area_hectares: Optional[float] = Field(None, gt=0, description="Площадь поля в гектарах, должна быть больше 0")
     crop_rotation: Optional[str] = Field(None, max_length=100, description="Информация о севообороте, не более 100 символов")
     cultivation_technology: Optional[str] = Field(None, max_length=100, description="Технология возделывания, не более 100 символов")
-    coordinates: Optional[str] = Field(..., description="Координаты поля в формате (широта, долгота)")
+    coordinates: Optional[str] = Field(..., description='Координаты поля: точка "(широта, долгота)" '
+                                       'или JSON-список контура [{"lat": широта, "lon": долгота}, ...]')
     farmer_id: Optional[int] = Field(None, description="ID фермера, к которому относится поле")
@@ -0,0 +1,90 @@
+import hashlib
+from typing import Hashable, NamedTuple
+
+from fastapi import Request, Response
+
+from app.cache import TTLCache
+from app.config import settings
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+    media_type: str
+    # Таблицы, изменение которых делает ответ устаревшим
+    tables: frozenset
+
+
+response_cache = TTLCache(maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL)
+# Поколение данных таблицы: растет при каждом изменении, по нему отбрасываются ответы, прочитанные до записи
+_generations: dict[str, int] = {}
+# Ключи закэшированных ответов по таблицам, чтобы инвалидация не перебирала весь кэш
+_table_keys: dict[str, set] = {}
+
+# Клиент может хранить ответ, но обязан перепроверять его через If-None-Match
+CACHE_HEADERS = {"Cache-Control": "no-cache"}
+
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из версии данных (id, updated_at и т.п.)."""
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest() + '"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
+
+
+def _to_response(request: Request, entry: CachedResponse) -> Response:
+    if is_not_modified(request, entry.etag):
+        return not_modified_response(entry.etag)
+    return Response(entry.body, media_type=entry.media_type, headers={"ETag": entry.etag, **CACHE_HEADERS})
+
+
+def get_cached_response(request: Request, key: Hashable) -> Response | None:
+    """Ответ из кэша (304 при совпадении ETag) или None, если записи нет."""
+    entry = response_cache.get(key)
+    return _to_response(request, entry) if entry else None
+
+
+def cache_generation(tables: tuple[str, ...]) -> tuple[int, ...]:
+    """Поколение данных таблиц; берется до чтения из БД и передается в store_response."""
+    return tuple(_generations.get(table, 0) for table in tables)
+
+
+def store_response(key: Hashable, etag: str, body: bytes, media_type: str,
+                   tables: tuple[str, ...], generation: tuple[int, ...]) -> CachedResponse:
+    """Кладет ответ в кэш, если с момента чтения (generation) таблицы не менялись.
+
+    Иначе ответ мог быть построен по данным до записи и прожил бы в кэше весь TTL после инвалидации.
+    """
+    entry = CachedResponse(etag, body, media_type, frozenset(tables))
+    if cache_generation(tables) != generation:
+        return entry
+    response_cache.set(key, entry)
+    for table in tables:
+        keys = _table_keys.setdefault(table, set())
+        keys.add(key)
+        # Ключи вытесненных по LRU/TTL записей убираются из индекса время от времени
+        if len(keys) > 2 * response_cache.maxsize:
+            keys.intersection_update([cached for cached in keys if cached in response_cache])
+    return entry
+
+
+def cache_response(request: Request, key: Hashable, etag: str, body: bytes, media_type: str,
+                   tables: tuple[str, ...], generation: tuple[int, ...]) -> Response:
+    return _to_response(request, store_response(key, etag, body, media_type, tables, generation))
+
+
+def invalidate_responses(table: str) -> None:
+    """Удаляет из кэша ответы, построенные по данным таблицы."""
+    _generations[table] = _generations.get(table, 0) + 1
+    for key in _table_keys.pop(table, ()):
+        response_cache.pop(key)
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, Request, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.config import settings
+
+PHOTOS_DIR = 'app/static/images/farmers'
+PHOTOS_URL = '/static/images/farmers'
+# Запас на границы и заголовки частей multipart сверх размера самого файла
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+# Декодирование и сжатие изображений нагружают CPU, поэтому выполняются в отдельных процессах
+_image_executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+
+
+def photo_url(photo: str | None, size: int) -> str | None:
+    """URL миниатюры для фото, загруженного через make_farmer_photo.
+
+    Внешние ссылки возвращаются без изменений.
+    """
+    if not photo or not photo.startswith(PHOTOS_URL):
+        return photo
+    digest = photo.rsplit('/', 1)[1].split('_', 1)[0]
+    # Ближайший сгенерированный размер не меньше запрошенного
+    size = min((variant for variant in settings.THUMBNAIL_SIZES if variant >= size),
+               default=max(settings.THUMBNAIL_SIZES))
+    return f'{PHOTOS_URL}/{digest}_{size}.webp'
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=f'Файл больше {max_bytes} байт')
+
+
+class _FilePartWriter:
+    """Колбэки MultipartParser: данные части field пишутся в открытый файл и хешируются по мере поступления."""
+
+    def __init__(self, field: str, output, max_bytes: int):
+        self.field = field.encode()
+        self.output = output
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.found = False
+        self.digest = hashlib.sha256()
+        self._header_name = b''
+        self._header_value = b''
+        self._disposition = b''
+        self._in_field = False
+
+    def callbacks(self) -> dict:
+        return {
+            'on_part_begin': self.on_part_begin,
+            'on_header_field': self.on_header_field,
+            'on_header_value': self.on_header_value,
+            'on_header_end': self.on_header_end,
+            'on_headers_finished': self.on_headers_finished,
+            'on_part_data': self.on_part_data,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b''
+        self._in_field = False
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b'content-disposition':
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b''
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        # Берется первая часть с нужным именем, повторы игнорируются
+        self._in_field = options.get(b'name') == self.field and not self.found
+        self.found = self.found or self._in_field
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_field:
+            return
+        self.size += end - start
+        if self.size > self.max_bytes:
+            raise _too_large(self.max_bytes)
+        chunk = data[start:end]
+        self.digest.update(chunk)
+        self.output.write(chunk)
+
+
+async def receive_upload(request: Request, field: str, max_bytes: int) -> tuple[str, str]:
+    """Принимает файл из поля field multipart-тела запроса во временный файл.
+
+    Тело читается из request.stream(), а не через UploadFile: Starlette сохраняет форму целиком до вызова
+    обработчика. Здесь запрос отклоняется (413) сразу по Content-Length или как только данные файла
+    превысят max_bytes. Возвращает путь к временному файлу (его удаляет вызывающий) и sha256 содержимого.
+    """
+    content_type, options = parse_options_header(request.headers.get('content-type', ''))
+    if content_type != b'multipart/form-data' or b'boundary' not in options:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Ожидается multipart/form-data')
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise _too_large(max_bytes)
+
+    fd, path = tempfile.mkstemp(suffix='.upload')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            writer = _FilePartWriter(field, output, max_bytes)
+            parser = MultipartParser(options[b'boundary'], writer.callbacks())
+            async for chunk in request.stream():
+                parser.write(chunk)
+            parser.finalize()
+        if not writer.found or not writer.size:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Файл не передан')
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, writer.digest.hexdigest()
+
+
+def _write_thumbnails(source: str, digest: str, sizes: tuple[int, ...]) -> None:
+    """Выполняется в процессе-воркере: уменьшает изображение и сохраняет варианты в WebP."""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        os.makedirs(PHOTOS_DIR, exist_ok=True)
+        for size in sizes:
+            path = os.path.join(PHOTOS_DIR, f'{digest}_{size}.webp')
+            # Имена файлов зависят от содержимого, поэтому уже созданные варианты не пересчитываются
+            if os.path.exists(path):
+                continue
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size))
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            thumbnail.save(tmp_path, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY, method=4)
+            os.replace(tmp_path, path)
+
+
+async def make_farmer_photo(request: Request, field: str = 'file') -> str:
+    """Сохраняет миниатюры фото из тела запроса и возвращает URL самого крупного варианта для Farmer.photo."""
+    path, digest = await receive_upload(request, field, settings.MAX_UPLOAD_BYTES)
+    digest = digest[:32]
+    sizes = tuple(sorted(settings.THUMBNAIL_SIZES))
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(_image_executor, _write_thumbnails, path, digest, sizes)
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Файл не является изображением')
+    finally:
+        os.unlink(path)
+    return f'{PHOTOS_URL}/{digest}_{sizes[-1]}.webp'
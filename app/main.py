@@ -1,12 +1,47 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from app.config import settings
+from app.database import engine, read_engine, monitor_replica_lag, PRIMARY_STICKY_COOKIE
+from app.metrics import MetricsMiddleware, instrument_engine, router as router_metrics
+from app.query_counter import QueryCountMiddleware, track_queries
 from app.farmers.router import router as router_farmers
 from app.fields.router import router as router_fields
 from app.users.router import router as router_users
 from app.pages.router import router as router_pages
-from fastapi.staticfiles import StaticFiles
+from app.static_assets import HashedStaticFiles, manifest
+from app.users.auth import compact_refresh_tokens
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [asyncio.create_task(compact_refresh_tokens())]
+    if read_engine is not None:
+        tasks.append(asyncio.create_task(monitor_replica_lag()))
+    yield
+    for task in tasks:
+        task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+
+instrument_engine(engine)
+track_queries(engine)
+if read_engine is not None:
+    instrument_engine(read_engine, "replica")
+    track_queries(read_engine)
 
 
-app = FastAPI()
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """После успешного изменения данных клиент какое-то время читает из основной БД, а не с реплики."""
+    response = await call_next(request)
+    if read_engine is not None and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.set_cookie(PRIMARY_STICKY_COOKIE, str(int(time.time()) + settings.READ_YOUR_WRITES_SECONDS),
+                            max_age=settings.READ_YOUR_WRITES_SECONDS, httponly=True)
+    return response
 
 
 @app.get("/")
@@ -18,5 +53,9 @@ app.include_router(router_farmers)
 app.include_router(router_fields)
 app.include_router(router_users)
 app.include_router(router_pages)
+app.include_router(router_metrics)
 
-app.mount('/static', StaticFiles(directory='app/static'), 'static')
+app.mount('/static', HashedStaticFiles(manifest), 'static')
+# Добавляется последним, чтобы оказаться снаружи остальных middleware и учитывать их время
+app.add_middleware(QueryCountMiddleware)
+app.add_middleware(MetricsMiddleware)
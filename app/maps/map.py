@@ -1,13 +1,51 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
 import folium
 
+from app.cache import TTLCache
+from app.config import settings
 
-# Функция для создания карты с маркером
-def create_map(lat, lon):
-    # Создаем карту с центром в указанных координатах
-    map_object = folium.Map(location=[lat, lon], zoom_start=15)
+# Точность ключа кэша: 6 знаков после запятой — около 10 см
+KEY_PRECISION = 6
+
+# Сборка карты folium занимает CPU, поэтому выполняется в отдельных процессах
+_map_executor = ProcessPoolExecutor(max_workers=settings.MAP_WORKERS)
+map_cache = TTLCache(maxsize=settings.MAP_CACHE_SIZE, ttl=settings.MAP_CACHE_TTL)
+# Карты, которые строятся прямо сейчас: одинаковые запросы ждут один результат
+_pending: dict[tuple, asyncio.Future] = {}
+
+
+def map_key(lat: float, lon: float, outline: list | None = None) -> tuple:
+    outline = tuple((round(p_lat, KEY_PRECISION), round(p_lon, KEY_PRECISION)) for p_lat, p_lon in outline or ())
+    return round(lat, KEY_PRECISION), round(lon, KEY_PRECISION), outline
 
-    # Добавляем маркер
+
+def render_map(lat: float, lon: float, outline: tuple = ()) -> str:
+    """Выполняется в процессе-воркере: строит карту с маркером и контуром поля и возвращает HTML."""
+    map_object = folium.Map(location=[lat, lon], zoom_start=15)
     folium.Marker([lat, lon], popup="Расположение объекта").add_to(map_object)
+    if outline:
+        folium.Polygon(locations=list(outline), color='#0000FF', weight=2,
+                       fill=True, fill_color='#00FF00', fill_opacity=0.5).add_to(map_object)
+    return map_object.get_root().render()
+
+
+async def create_map(lat: float, lon: float, outline: list | None = None) -> str:
+    """HTML карты без записи на диск; результат кэшируется по координатам."""
+    key = map_key(lat, lon, outline)
+    html = map_cache.get(key)
+    if html is not None:
+        return html
+    if key in _pending:
+        return await asyncio.shield(_pending[key])
 
-    # Сохраняем карту в HTML файл
-    map_object.save('map.html')
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_map_executor, render_map, *key)
+    _pending[key] = future
+    try:
+        html = await asyncio.shield(future)
+    finally:
+        _pending.pop(key, None)
+    map_cache.set(key, html)
+    return html
@@ -0,0 +1,198 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+
+from app.database import get_pool_stats
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Метод DAO, который сейчас выполняет запросы (выставляет BaseDAO); остальные запросы попадают в "other"
+query_source: ContextVar[str] = ContextVar("query_source", default="other")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: счетчики по границам корзин, сумма и число наблюдений на набор меток."""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # метки -> [счетчики корзин (последняя — +Inf), сумма]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+class Gauge:
+    """Текущее значение на набор меток (например, число запросов в обработке)."""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+# Показатели, которые вычисляются в момент сбора: имя -> (описание, функция без аргументов)
+_callback_gauges: dict[str, tuple[str, Callable[[], float]]] = {}
+
+
+def register_gauge(name: str, documentation: str, func: Callable[[], float]) -> None:
+    """Регистрирует показатель модуля, значение которого читается при каждом запросе /metrics."""
+    _callback_gauges[name] = (documentation, func)
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса до отправки последнего байта ответа.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+requests_in_flight = Gauge("http_requests_in_flight", "Запросы, которые обрабатываются сейчас.", ("method",))
+sql_latency = Histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запросов по методам DAO.", ("engine", "source"), SQL_BUCKETS,
+)
+
+# Показатели пула: имя метрики, тип, ключ get_pool_stats
+POOL_METRICS = (
+    ("db_pool_size", "gauge", "size"),
+    ("db_pool_checked_out", "gauge", "checked_out"),
+    ("db_pool_checked_in", "gauge", "checked_in"),
+    ("db_pool_overflow", "gauge", "overflow"),
+    ("db_pool_checkouts_total", "counter", "checkouts"),
+    ("db_pool_timeouts_total", "counter", "timeouts"),
+    ("db_pool_wait_seconds_total", "counter", "wait_seconds_total"),
+    ("db_pool_wait_seconds_max", "gauge", "wait_seconds_max"),
+)
+
+
+def _route_template(scope: dict, root_path: str) -> str:
+    """Шаблон пути (/fields/{field_id}), а не сам путь: иначе число рядов метрики растет без ограничений."""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or getattr(route, "path", UNMATCHED_ROUTE)
+    # Mount (например, /static) не выставляет route, но дописывает свой путь к root_path
+    mount_path = scope.get("root_path", "")
+    if mount_path != root_path:
+        return mount_path[len(root_path):] + "/{path}"
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI-middleware, замеряющее время запросов по шаблонам маршрутов и число запросов в обработке.
+
+    Время считается до окончания отправки тела, поэтому потоковые ответы учитываются целиком.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        root_path = scope.get("root_path", "")
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            requests_in_flight.dec(method)
+            request_latency.observe(time.perf_counter() - started,
+                                    method, _route_template(scope, root_path), status_code)
+
+
+def instrument_engine(engine, name: str = "primary") -> None:
+    """Подписывается на события выполнения запросов движка и пишет их время в sql_latency."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        sql_latency.observe(time.perf_counter() - context._metrics_started, name, query_source.get())
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in (request_latency, requests_in_flight, sql_latency):
+        lines.extend(metric.collect())
+    stats = get_pool_stats()
+    for name, kind, key in POOL_METRICS:
+        lines.extend((f"# TYPE {name} {kind}", f"{name} {stats[key]}"))
+    for name, (documentation, func) in _callback_gauges.items():
+        lines.extend((f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {func()}"))
+    return "\n".join(lines) + "\n"
+
+
+router = APIRouter(tags=['Метрики'])
+
+
+@router.get("/metrics", summary="Метрики в формате Prometheus", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -0,0 +1,38 @@
+"""added indexes for farmer and field filters
+
+Revision ID: 0b6e4d2f8a91
+Revises: f2a8c61d9e47
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e4d2f8a91'
+down_revision: Union[str, None] = 'f2a8c61d9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_fields_farmer_id_id', 'fields', ['farmer_id', 'id']),
+    ('ix_fields_crop_rotation_id', 'fields', ['crop_rotation', 'id']),
+    ('ix_fields_cultivation_technology_id', 'fields', ['cultivation_technology', 'id']),
+    ('ix_farmers_last_name_id', 'farmers', ['last_name', 'id']),
+    ('ix_farmers_first_name_id', 'farmers', ['first_name', 'id']),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в таблицы, но не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
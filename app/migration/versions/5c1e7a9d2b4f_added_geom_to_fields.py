@@ -0,0 +1,69 @@
+"""added geom polygon with gist index to fields
+
+Revision ID: 5c1e7a9d2b4f
+Revises: 92339f54acdf
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import json
+import logging
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7a9d2b4f'
+down_revision: Union[str, None] = '92339f54acdf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 1000
+# Разбор координат зафиксирован на момент миграции и не зависит от последующих правок app.fields.geometry
+_POINT_RE = re.compile(r'^\(\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\)$')
+
+
+def _parse_coordinates(coordinates: str) -> list[tuple[float, float]]:
+    match = _POINT_RE.match(coordinates.strip())
+    if match:
+        return [(float(match.group(1)), float(match.group(2)))]
+    return [(float(point["lat"]), float(point["lon"])) for point in json.loads(coordinates)]
+
+
+def _polygon_literal(points: list[tuple[float, float]]) -> str:
+    # В polygon точка хранится как (x=долгота, y=широта)
+    return "(" + ",".join(f"({lon},{lat})" for lat, lon in points) + ")"
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE fields ADD COLUMN geom polygon")
+
+    # Перенос существующих координат из JSON-строк в polygon; неразборчивые строки остаются с geom = NULL
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, coordinates FROM fields WHERE coordinates IS NOT NULL")).all()
+    updates = []
+    for field_id, coordinates in rows:
+        try:
+            points = _parse_coordinates(coordinates)
+        except Exception as e:
+            logger.warning("fields.id=%s: координаты не разобраны (%r), geom оставлен пустым: %s",
+                           field_id, e, coordinates)
+            continue
+        if points:
+            updates.append({"id": field_id, "geom": _polygon_literal(points)})
+
+    # Параметр передается как text: иначе драйвер (asyncpg) ждет для polygon последовательность точек
+    update = sa.text("UPDATE fields SET geom = CAST(CAST(:geom AS text) AS polygon) WHERE id = :id")
+    for start in range(0, len(updates), BATCH_SIZE):
+        bind.execute(update, updates[start:start + BATCH_SIZE])
+
+    op.create_index('ix_fields_geom', 'fields', ['geom'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fields_geom', table_name='fields', postgresql_using='gist')
+    op.drop_column('fields', 'geom')
@@ -0,0 +1,69 @@
+"""added computed area, perimeter and centroid to fields
+
+Revision ID: 8a3f61c0e7d2
+Revises: 5c1e7a9d2b4f
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+import json
+import logging
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.fields.geometry import geometry_columns
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3f61c0e7d2'
+down_revision: Union[str, None] = '5c1e7a9d2b4f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+COLUMNS = ('computed_area_hectares', 'perimeter_m', 'centroid_lat', 'centroid_lon')
+BATCH_SIZE = 1000
+# Разбор координат зафиксирован на момент миграции и не зависит от последующих правок app.fields.geometry.
+# Сами метрики считаются текущим кодом: при его изменении их пересчитывает POST /fields/recompute_geometry/
+_POINT_RE = re.compile(r'^\(\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\)$')
+
+
+def _parse_coordinates(coordinates: str) -> list[tuple[float, float]]:
+    match = _POINT_RE.match(coordinates.strip())
+    if match:
+        return [(float(match.group(1)), float(match.group(2)))]
+    return [(float(point["lat"]), float(point["lon"])) for point in json.loads(coordinates)]
+
+
+def upgrade() -> None:
+    for column in COLUMNS:
+        op.add_column('fields', sa.Column(column, sa.Float(), nullable=True))
+
+    # Заполнение по существующим контурам одним векторизованным проходом; неразборчивые строки
+    # остаются с пустыми метриками
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, coordinates FROM fields WHERE coordinates IS NOT NULL")).all()
+    ids, polygons = [], []
+    for field_id, coordinates in rows:
+        try:
+            points = _parse_coordinates(coordinates)
+        except Exception as e:
+            logger.warning("fields.id=%s: координаты не разобраны (%r), метрики оставлены пустыми: %s",
+                           field_id, e, coordinates)
+            continue
+        if points:
+            ids.append(field_id)
+            polygons.append(points)
+    updates = [{"id": field_id, **values} for field_id, values in zip(ids, geometry_columns(polygons))]
+
+    update = sa.text(f"UPDATE fields SET {', '.join(f'{column} = :{column}' for column in COLUMNS)} WHERE id = :id")
+    for start in range(0, len(updates), BATCH_SIZE):
+        bind.execute(update, updates[start:start + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    for column in reversed(COLUMNS):
+        op.drop_column('fields', column)
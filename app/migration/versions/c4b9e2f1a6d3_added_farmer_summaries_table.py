@@ -0,0 +1,53 @@
+"""added farmer_summaries table
+
+Revision ID: c4b9e2f1a6d3
+Revises: 8a3f61c0e7d2
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4b9e2f1a6d3'
+down_revision: Union[str, None] = '8a3f61c0e7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('farmer_summaries',
+    sa.Column('farmer_id', sa.Integer(), nullable=False),
+    sa.Column('fields_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('total_area_hectares', sa.Float(), server_default=sa.text('0'), nullable=False),
+    sa.Column('crop_mix', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['farmer_id'], ['farmers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('farmer_id')
+    )
+    # Начальное заполнение по существующим полям
+    op.execute("""
+        INSERT INTO farmer_summaries (farmer_id, fields_count, total_area_hectares, crop_mix)
+        SELECT farmers.id,
+               coalesce(sum(per_crop.fields_count), 0),
+               coalesce(sum(per_crop.area), 0),
+               coalesce(jsonb_object_agg(per_crop.crop_rotation, per_crop.fields_count)
+                        FILTER (WHERE per_crop.farmer_id IS NOT NULL), '{}'::jsonb)
+        FROM farmers
+        LEFT OUTER JOIN (
+            SELECT farmer_id, coalesce(crop_rotation, '') AS crop_rotation,
+                   count(id) AS fields_count, sum(area_hectares) AS area
+            FROM fields
+            GROUP BY farmer_id, coalesce(crop_rotation, '')
+        ) AS per_crop ON per_crop.farmer_id = farmers.id
+        GROUP BY farmers.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('farmer_summaries')
@@ -0,0 +1,39 @@
+"""added search_text to farmers and fields
+
+Revision ID: f2a8c61d9e47
+Revises: e7d3a9c21b5f
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a8c61d9e47'
+down_revision: Union[str, None] = 'e7d3a9c21b5f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('farmers', sa.Column(
+        'search_text', sa.Text(),
+        sa.Computed("last_name || ' ' || first_name || ' ' || farm_name", persisted=True), nullable=False))
+    op.add_column('fields', sa.Column(
+        'search_text', sa.Text(),
+        sa.Computed("name || ' ' || coalesce(crop_rotation, '')", persisted=True), nullable=False))
+    op.create_index('ix_farmers_search_text', 'farmers', ['search_text'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.create_index('ix_fields_search_text', 'fields', ['search_text'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fields_search_text', table_name='fields', postgresql_using='gin')
+    op.drop_index('ix_farmers_search_text', table_name='farmers', postgresql_using='gin')
+    op.drop_column('fields', 'search_text')
+    op.drop_column('farmers', 'search_text')
@@ -0,0 +1,62 @@
+from typing import AsyncIterator, Hashable
+
+from fastapi.responses import StreamingResponse
+from jinja2 import Environment, FileSystemLoader
+from markupsafe import Markup
+
+from app.cache import TTLCache
+from app.config import settings
+from app.http_cache import CACHE_HEADERS, store_response
+from app.images import photo_url
+from app.static_assets import static_url
+
+HTML_MEDIA_TYPE = 'text/html; charset=utf-8'
+
+# Отдельное асинхронное окружение: шаблоны компилируются один раз и не перепроверяются на диске
+env = Environment(
+    loader=FileSystemLoader('app/templates'),
+    autoescape=True,
+    enable_async=True,
+    auto_reload=False,
+)
+env.filters['thumbnail'] = photo_url
+env.globals['static_url'] = static_url
+STREAMED_TEMPLATES = ('fields.html', 'farmers.html', 'partials/field_card.html', 'partials/farmer_card.html')
+for _name in STREAMED_TEMPLATES:
+    env.get_template(_name)
+
+# HTML карточек по (шаблон, id, updated_at): новая версия записи получает новый ключ
+fragment_cache = TTLCache(maxsize=settings.FRAGMENT_CACHE_SIZE, ttl=settings.FRAGMENT_CACHE_TTL)
+
+
+async def render_fragment(name: str, entity_id: int, updated_at, context: dict) -> Markup:
+    key = (name, entity_id, updated_at)
+    html = fragment_cache.get(key)
+    if html is None:
+        html = Markup(await env.get_template(name).render_async(context))
+        fragment_cache.set(key, html)
+    return html
+
+
+async def render_cards(name: str, var: str, rows: AsyncIterator) -> AsyncIterator[Markup]:
+    """Карточки по мере чтения строк; строка — словарь с id и updated_at."""
+    async for row in rows:
+        yield await render_fragment(name, row['id'], row['updated_at'], {var: row})
+
+
+def stream_page(cache_key: Hashable, etag: str, name: str, context: dict,
+                tables: tuple[str, ...], generation: tuple[int, ...]) -> StreamingResponse:
+    """Отдает страницу по частям и кладет ее целиком в кэш ответов после успешной отправки.
+
+    generation берется в маршруте до первого запроса к БД: если за время отправки таблицы изменились,
+    страница в кэш не попадет.
+    """
+    async def body():
+        chunks = []
+        async for chunk in env.get_template(name).generate_async(context):
+            data = chunk.encode()
+            chunks.append(data)
+            yield data
+        store_response(cache_key, etag, b''.join(chunks), HTML_MEDIA_TYPE, tables, generation)
+
+    return StreamingResponse(body(), media_type=HTML_MEDIA_TYPE, headers={'ETag': etag, **CACHE_HEADERS})
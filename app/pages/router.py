@@ -1,42 +1,131 @@
-import shutil
-
-from fastapi import APIRouter, Request, Depends, UploadFile
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from app.farmers.router import get_all_farmers, get_farmer_by_id
-from app.fields.router import get_all_fields
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db_session, get_read_session, read_session_maker
+from app.farmers.dao import FarmerDAO, FarmerSummaryDAO
+from app.fields.dao import FieldsDAO
+from app.fields.rb import RBField
+from app.images import make_farmer_photo, photo_url
+from app.maps.map import create_map
+from app.http_cache import (get_cached_response, cache_response, cache_generation, make_etag, is_not_modified,
+                             not_modified_response)
+from app.pages.rendering import render_cards, stream_page
+from app.static_assets import static_url
 from app.users.router import get_me
 
 router = APIRouter(prefix='/pages', tags=['Фронтенд'])
 templates = Jinja2Templates(directory='app/templates')
+templates.env.filters['thumbnail'] = photo_url
+templates.env.globals['static_url'] = static_url
 
 
-@router.get('/fields')
-async def get_fields_html(request: Request, fields=Depends(get_all_fields)):
-    return templates.TemplateResponse(
-        name='fields.html',
-        context={'request': request, 'fields': fields}
-    )
+def _render_cached(request: Request, cache_key: tuple, etag: str, name: str, context: dict,
+                   tables: tuple[str, ...], generation: tuple[int, ...]):
+    html = templates.get_template(name).render({'request': request, **context})
+    return cache_response(request, cache_key, etag, html.encode(), 'text/html; charset=utf-8', tables, generation)
 
 
-@router.get('/farmers')
-async def get_farmers_html(request: Request, farmers=Depends(get_all_farmers)):
-    return templates.TemplateResponse(
-        name='farmers.html',
-        context={'request': request, 'farmers': farmers}
-    )
+async def _stream_fields(session_maker, filter_by: dict):
+    # Сессия открывается внутри генератора: сессия обработчика закрывается до отправки тела ответа
+    async with session_maker() as session:
+        async for field in FieldsDAO.stream_fields(session, **filter_by):
+            yield field
 
 
-@router.post('/add_photo')
-async def add_farmer_photo(file: UploadFile, img_name: int):
-    with open(f"app/static/images/{img_name}.webp", "wb+") as photo_obj:
-        shutil.copyfileobj(file.file, photo_obj)
+async def _stream_farmers(session_maker):
+    async with session_maker() as session:
+        async for farmer in FarmerDAO.stream_all_with_stats(session):
+            yield farmer
+
+
+@router.get('/fields')
+async def get_fields_html(request: Request, request_body: RBField = Depends()):
+    cache_key = ('page', 'fields', str(request.query_params))
+    cached = get_cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    tables = ('fields', 'farmers')
+    generation = cache_generation(tables)
+    # Версия для ETag и карточки читаются из одной БД: ETag основной БД с данными реплики закэшировал бы
+    # у клиента устаревшую страницу
+    session_maker = read_session_maker(request)
+    async with session_maker() as session:
+        etag = make_etag(cache_key, await FieldsDAO.get_version(session))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    cards = render_cards('partials/field_card.html', 'field', _stream_fields(session_maker, request_body.to_dict()))
+    return stream_page(cache_key, etag, 'fields.html', {'request': request, 'cards': cards}, tables, generation)
+
+
+@router.get('/farmers')
+async def get_farmers_html(request: Request):
+    cache_key = ('page', 'farmers')
+    cached = get_cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    tables = ('farmers', 'fields', 'farmer_summaries')
+    generation = cache_generation(tables)
+    session_maker = read_session_maker(request)
+    async with session_maker() as session:
+        version = (await FarmerDAO.get_version(session), await FarmerSummaryDAO.get_version(session))
+    etag = make_etag(cache_key, version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    # Количество и площадь полей берутся из сводной таблицы, сами поля не загружаются
+    cards = render_cards('partials/farmer_card.html', 'farmer', _stream_farmers(session_maker))
+    return stream_page(cache_key, etag, 'farmers.html', {'request': request, 'cards': cards}, tables, generation)
+
+
+# Тело разбирается в обработчике потоком, поэтому поле file описано для документации вручную
+PHOTO_UPLOAD_BODY = {'requestBody': {'required': True, 'content': {'multipart/form-data': {'schema': {
+    'type': 'object', 'required': ['file'], 'properties': {'file': {'type': 'string', 'format': 'binary'}},
+}}}}}
+
+
+@router.post('/add_photo', openapi_extra=PHOTO_UPLOAD_BODY)
+async def add_farmer_photo(request: Request, img_name: int,
+                           session: AsyncSession = Depends(get_db_session, scope="function")):
+    """Загружает фото фермера с ID img_name и сохраняет его миниатюры."""
+    farmer = await FarmerDAO.find_one_or_none_by_id(session, img_name)
+    photo = await make_farmer_photo(request)
+    await FarmerDAO.update(session, farmer, photo=photo)
+    return {'message': 'Фото фермера обновлено', 'photo': photo}
 
 
 @router.get('/farmers/{farmer_id}')
-async def get_farmers_html(request: Request, farmer=Depends(get_farmer_by_id)):
+async def get_farmer_html(request: Request, farmer_id: int, session: AsyncSession = Depends(get_read_session)):
+    cache_key = ('page', 'farmer', farmer_id)
+    cached = get_cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    tables = ('farmers', 'fields', 'farmer_summaries')
+    generation = cache_generation(tables)
+    farmer = await FarmerDAO.find_full_data(session, farmer_id)
+    etag = make_etag(cache_key, farmer['updated_at'])
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return _render_cached(request, cache_key, etag, 'farmer.html', {'farmer': farmer}, tables, generation)
+
+
+@router.get('/fields/{field_id}/map')
+async def get_field_map_html(field_id: int, session: AsyncSession = Depends(get_read_session)):
+    field = await FieldsDAO.find_one_or_none_by_id(session, field_id)
+    if field.centroid_lat is None:
+        raise HTTPException(status_code=404, detail="У поля не заданы координаты")
+    html = await create_map(field.centroid_lat, field.centroid_lon, field.geom)
+    return HTMLResponse(content=html)
+
+
+@router.get('/map')
+async def get_map_html(request: Request):
     return templates.TemplateResponse(
-        name='farmer.html',
-        context={'request': request, 'farmer': farmer}
+        name='map.html',
+        context={'request': request, 'center': (55.75, 37.62)}
     )
 
 
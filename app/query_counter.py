@@ -0,0 +1,93 @@
+import logging
+import re
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.metrics import query_source
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+N_PLUS_ONE_HEADER = "X-N-Plus-One"
+# Литералы IN (...) из selectinload зависят от размера пачки; без них одинаковые запросы совпадают по тексту
+_IN_LIST = re.compile(r"IN \((?:[^()]|\([^()]*\))*\)")
+
+
+def normalize(statement: str) -> str:
+    return _IN_LIST.sub("IN (...)", " ".join(statement.split()))
+
+
+class QueryLog:
+    """SQL-запросы одного HTTP-запроса (или блока кода): число и повторы одинакового текста."""
+
+    def __init__(self):
+        self.count = 0
+        self.statements: Counter = Counter()
+        self.sources: dict[str, str] = {}
+
+    def record(self, statement: str, source: str) -> None:
+        self.count += 1
+        statement = normalize(statement)
+        self.statements[statement] += 1
+        self.sources.setdefault(statement, source)
+
+    def suspects(self, threshold: int | None = None) -> list[tuple[str, str, int]]:
+        """Подозрения на N+1: один и тот же запрос (с разными параметрами) выполнен threshold раз и более."""
+        threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        return [(self.sources[statement], statement, repeats)
+                for statement, repeats in self.statements.most_common() if repeats >= threshold]
+
+
+# Журнал текущего запроса; None — запросы не считаются
+current_log: ContextVar[QueryLog | None] = ContextVar("current_log", default=None)
+
+
+def track_queries(engine) -> None:
+    """Подписывается на выполнение запросов движка и пишет их в журнал текущего запроса."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        log = current_log.get()
+        if log is not None:
+            log.record(statement, query_source.get())
+
+
+class QueryCountMiddleware:
+    """ASGI-middleware: считает SQL-запросы каждого HTTP-запроса и ищет повторы (N+1).
+
+    При QUERY_DEBUG_HEADERS число запросов и источники повторов попадают в заголовки ответа.
+    Заголовки уходят до тела, поэтому у потоковых ответов учитываются только запросы до начала отправки;
+    в лог предупреждение пишется по полному журналу.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        log = QueryLog()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.QUERY_DEBUG_HEADERS:
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.lower().encode(), str(log.count).encode()))
+                suspects = log.suspects()
+                if suspects:
+                    value = ", ".join(f"{source} ({repeats})" for source, _, repeats in suspects)
+                    headers.append((N_PLUS_ONE_HEADER.lower().encode(), value.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = current_log.set(log)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_log.reset(token)
+            for source, statement, repeats in log.suspects():
+                logger.warning('Возможный N+1 в %s %s: %s выполнил %d раз: %s',
+                               scope["method"], scope["path"], source, repeats, statement)
@@ -0,0 +1,103 @@
+import math
+import time
+
+from fastapi import HTTPException, Request, status
+
+from app.cache import TTLCache
+from app.config import settings
+from app.metrics import register_gauge
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis необязателен: без него корзины хранятся в памяти процесса
+    redis = None
+
+
+class MemoryBucketStore:
+    """Корзины в памяти процесса; неактивные ключи вытесняются по LRU и TTL."""
+
+    def __init__(self, maxsize: int):
+        self._buckets = TTLCache(maxsize=maxsize, ttl=0)
+
+    async def take(self, key: str, capacity: int, rate: float) -> float:
+        """Списывает токен; возвращает 0 или время в секундах до появления следующего токена."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        retry_after = 0.0 if tokens >= 1 else (1 - tokens) / rate
+        if not retry_after:
+            tokens -= 1
+        # Запись нужна, пока корзина не наполнится заново
+        self._buckets.set(key, (tokens, now), ttl=(capacity - tokens) / rate + 1)
+        return retry_after
+
+
+class RedisBucketStore:
+    """Корзины в Redis, общие для всех воркеров; проверка и списание выполняются атомарно в скрипте."""
+
+    SCRIPT = """
+    local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local retry_after = 0
+    if tokens >= 1 then tokens = tokens - 1 else retry_after = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+    return tostring(retry_after)
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("Для RATE_LIMIT_REDIS_URL нужен пакет redis")
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, capacity: int, rate: float) -> float:
+        return float(await self._script(keys=[f'rate_limit:{key}'], args=[capacity, rate, time.time()]))
+
+
+def _create_store():
+    if settings.RATE_LIMIT_REDIS_URL:
+        return RedisBucketStore(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryBucketStore(settings.RATE_LIMIT_STORE_SIZE)
+
+
+bucket_store = _create_store()
+
+
+class RateLimiter:
+    """Token bucket: до capacity запросов подряд, затем per_minute запросов в минуту на ключ."""
+
+    def __init__(self, name: str, capacity: int, per_minute: float):
+        self.name = name
+        self.capacity = capacity
+        self.rate = per_minute / 60
+        self.allowed = 0
+        self.rejected = 0
+
+    async def hit(self, key: str) -> None:
+        retry_after = await bucket_store.take(f'{self.name}:{key}', self.capacity, self.rate)
+        if not retry_after:
+            self.allowed += 1
+            return
+        self.rejected += 1
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail='Слишком много попыток, повторите позже',
+                            headers={'Retry-After': str(math.ceil(retry_after))})
+
+
+login_ip_limiter = RateLimiter('login_ip', settings.LOGIN_IP_BURST, settings.LOGIN_IP_PER_MINUTE)
+login_email_limiter = RateLimiter('login_email', settings.LOGIN_EMAIL_BURST, settings.LOGIN_EMAIL_PER_MINUTE)
+limiters = (login_ip_limiter, login_email_limiter)
+
+for _limiter in limiters:
+    register_gauge(f"rate_limit_{_limiter.name}_allowed", f"Попытки, пропущенные ограничителем {_limiter.name}.",
+                   lambda limiter=_limiter: limiter.allowed)
+    register_gauge(f"rate_limit_{_limiter.name}_rejected", f"Попытки, отклоненные ограничителем {_limiter.name}.",
+                   lambda limiter=_limiter: limiter.rejected)
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else 'unknown'
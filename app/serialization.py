@@ -0,0 +1,29 @@
+from functools import lru_cache
+from typing import Iterable
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+# Контекст проверки для данных, прочитанных из БД: схемы пропускают дорогие проверки входных данных
+FROM_DB = {'from_db': True}
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+
+def dump_list_json(rows: Iterable, schema: type[BaseModel]) -> bytes:
+    """ORM-объекты, строки Row или словари -> JSON-массив по схеме.
+
+    Атрибуты читаются и сериализуются в pydantic-core за один проход, без промежуточных
+    словарей и повторной проверки ответа в FastAPI.
+    """
+    adapter = _list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True, context=FROM_DB))
+
+
+def json_list_response(rows: Iterable, schema: type[BaseModel]) -> Response:
+    """Готовый ответ: FastAPI не валидирует его повторно по response_model."""
+    return Response(dump_list_json(rows, schema), media_type='application/json')
@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаются только gzip-варианты
+    brotli = None
+
+STATIC_DIR = 'app/static'
+STATIC_URL = '/static'
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+# Текстовые файлы держим в памяти вместе со сжатыми вариантами, картинки уже сжаты
+COMPRESSIBLE = {'.css', '.js', '.svg', '.html', '.json', '.txt', '.map'}
+# Загруженные фото уже названы по хешу содержимого (см. app.images)
+CONTENT_ADDRESSED_PREFIXES = ('images/farmers/',)
+_CSS_URL_RE = re.compile(r'url\(\s*(["\']?)' + re.escape(STATIC_URL) + r'/([^"\')]+)\1\s*\)')
+
+
+@dataclass
+class Asset:
+    path: str
+    hashed_path: str
+    etag: str
+    media_type: str
+    content: bytes | None = None
+    gzip: bytes | None = None
+    br: bytes | None = None
+
+
+class AssetManifest:
+    """Соответствие исходных путей статики путям с хешем содержимого в имени."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.by_path: dict[str, Asset] = {}
+        self.by_hashed_path: dict[str, Asset] = {}
+
+    def build(self) -> None:
+        paths = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.relpath(os.path.join(root, name), self.directory).replace(os.sep, '/')
+                if not path.startswith(CONTENT_ADDRESSED_PREFIXES):
+                    paths.append(path)
+        # CSS ссылается на другие файлы, поэтому хешируется после них, уже с переписанными url()
+        paths.sort(key=lambda path: path.endswith('.css'))
+        for path in paths:
+            self._add(path)
+
+    def _add(self, path: str) -> None:
+        with open(os.path.join(self.directory, path), 'rb') as file:
+            content = file.read()
+        stem, ext = os.path.splitext(path)
+        if ext == '.css':
+            content = _CSS_URL_RE.sub(lambda match: f'url("{self.url(match.group(2))}")',
+                                      content.decode()).encode()
+        digest = hashlib.sha256(content).hexdigest()
+        asset = Asset(
+            path=path,
+            hashed_path=f'{stem}.{digest[:12]}{ext}',
+            etag=f'"{digest[:32]}"',
+            media_type=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+        )
+        if ext in COMPRESSIBLE:
+            asset.content = content
+            asset.gzip = gzip.compress(content, compresslevel=9, mtime=0)
+            if brotli is not None:
+                asset.br = brotli.compress(content, quality=11)
+        self.by_path[path] = asset
+        self.by_hashed_path[asset.hashed_path] = asset
+
+    def url(self, path: str) -> str:
+        """URL статического файла с хешем; для неизвестных файлов — обычный путь."""
+        path = path.lstrip('/')
+        asset = self.by_path.get(path)
+        return f'{STATIC_URL}/{asset.hashed_path if asset else path}'
+
+
+manifest = AssetManifest(STATIC_DIR)
+manifest.build()
+
+
+def static_url(path: str) -> str:
+    return manifest.url(path)
+
+
+class HashedStaticFiles(StaticFiles):
+    """Раздача статики: пути с хешем кэшируются навсегда, остальные — с перепроверкой по ETag."""
+
+    def __init__(self, manifest: AssetManifest, **kwargs):
+        super().__init__(directory=manifest.directory, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope) -> Response:
+        path = path.replace(os.sep, '/')
+        asset = self.manifest.by_hashed_path.get(path)
+        if asset is None:
+            response = await super().get_response(path, scope)
+            if response.status_code in (200, 304):
+                immutable = path.startswith(CONTENT_ADDRESSED_PREFIXES)
+                response.headers['Cache-Control'] = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+            return response
+
+        request_headers = Headers(scope=scope)
+        headers = {'ETag': asset.etag, 'Cache-Control': IMMUTABLE_CACHE}
+        if request_headers.get('if-none-match') == asset.etag:
+            return Response(status_code=304, headers=headers)
+        if asset.content is None:
+            return FileResponse(os.path.join(self.manifest.directory, asset.path),
+                                media_type=asset.media_type, headers=headers)
+
+        headers['Vary'] = 'Accept-Encoding'
+        accept_encoding = request_headers.get('accept-encoding', '')
+        body = asset.content
+        if asset.br is not None and 'br' in accept_encoding:
+            body, headers['Content-Encoding'] = asset.br, 'br'
+        elif 'gzip' in accept_encoding:
+            body, headers['Content-Encoding'] = asset.gzip, 'gzip'
+        return Response(body, media_type=asset.media_type, headers=headers)
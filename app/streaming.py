@@ -0,0 +1,16 @@
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _ndjson_lines(rows: AsyncIterator, schema: type[BaseModel]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield schema.model_validate(row).model_dump_json().encode() + b"\n"
+
+
+def ndjson_response(rows: AsyncIterator, schema: type[BaseModel]) -> StreamingResponse:
+    """Отдает строки в формате NDJSON по мере их чтения из БД."""
+    return StreamingResponse(_ndjson_lines(rows, schema), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,57 @@
+"""Помощники для pytest: ограничение числа SQL-запросов в блоке кода или в запросе к эндпоинту.
+
+    def test_farmers_list(client):
+        assert_endpoint_queries(client, "GET", "/farmers/", max_queries=2)
+
+    async def test_find_principal(session):
+        with assert_max_queries(1):
+            await UsersDAO.find_principal(session, user_id=1)
+"""
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.config import settings
+from app.query_counter import QueryLog, current_log, QUERY_COUNT_HEADER, N_PLUS_ONE_HEADER
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryLog]:
+    """Журнал SQL-запросов, выполненных внутри блока в текущем контексте."""
+    log = QueryLog()
+    token = current_log.set(log)
+    try:
+        yield log
+    finally:
+        current_log.reset(token)
+
+
+def _check(count: int, max_queries: int, suspects: str, allow_n_plus_one: bool) -> None:
+    assert count <= max_queries, f"Выполнено {count} SQL-запросов, допустимо не больше {max_queries}. {suspects}"
+    assert allow_n_plus_one or not suspects, f"Повторяющиеся запросы (N+1): {suspects}"
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, allow_n_plus_one: bool = False) -> Iterator[QueryLog]:
+    with count_queries() as log:
+        yield log
+    suspects = "; ".join(f"{source} ({repeats}): {statement}" for source, statement, repeats in log.suspects())
+    _check(log.count, max_queries, suspects, allow_n_plus_one)
+
+
+def assert_endpoint_queries(client, method: str, url: str, max_queries: int, allow_n_plus_one: bool = False,
+                            **kwargs):
+    """Выполняет запрос через TestClient и проверяет число SQL-запросов по отладочным заголовкам ответа.
+
+    Приложение в TestClient работает в другом потоке, поэтому журнал читается из заголовков, а не из контекста.
+    У потоковых ответов учитываются только запросы до начала отправки тела.
+    """
+    enabled = settings.QUERY_DEBUG_HEADERS
+    settings.QUERY_DEBUG_HEADERS = True
+    try:
+        response = client.request(method, url, **kwargs)
+    finally:
+        settings.QUERY_DEBUG_HEADERS = enabled
+    count = response.headers.get(QUERY_COUNT_HEADER)
+    assert count is not None, f"{method} {url}: нет заголовка {QUERY_COUNT_HEADER}, QueryCountMiddleware не подключен"
+    _check(int(count), max_queries, response.headers.get(N_PLUS_ONE_HEADER, ""), allow_n_plus_one)
+    return response
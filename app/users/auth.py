@@ -1,13 +1,31 @@
+import asyncio
+import logging
+from uuid import uuid4
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
 from passlib.context import CryptContext
-from jose import jwt, JWTError
+from jose import JWTError
 from datetime import datetime, timedelta, timezone
 from pydantic import EmailStr
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import get_auth_data
-from app.users.dao import UsersDAO
+from app.config import settings
+from app.database import async_session_maker
+from app.exceptions import TokenRevokedException
+from app.metrics import register_gauge
+from app.users.dao import UsersDAO, RefreshTokenDAO
+from app.users.tokens import jwt_codec
+
+logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=15)
+REFRESH_TOKEN_LIFETIME = timedelta(days=30)
+
+# min_rounds = rounds: при изменении BCRYPT_ROUNDS старые хеши считаются устаревшими и пересчитываются при входе
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                           bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+                           bcrypt__min_rounds=settings.BCRYPT_ROUNDS)
 
 
 def get_password_hash(password: str) -> str:
@@ -18,33 +36,119 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Проверяет пароль и возвращает новый хеш, если текущий создан с устаревшими параметрами."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# bcrypt занимает 100-300 мс CPU, поэтому хеширование выполняется вне цикла событий
+def _create_hash_executor() -> Executor:
+    if settings.PASSWORD_HASH_EXECUTOR == "process":
+        return ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+_hash_executor = _create_hash_executor()
+_hash_tasks = 0
+
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_tasks
+    _hash_tasks += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_tasks -= 1
+
+
+def password_hash_queue_depth() -> int:
+    """Количество задач хеширования, ожидающих свободного воркера."""
+    return max(0, _hash_tasks - settings.PASSWORD_HASH_WORKERS)
+
+
+register_gauge("password_hash_queue_depth", "Задачи хеширования паролей, ожидающие свободного воркера.",
+               password_hash_queue_depth)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await _run_in_hash_pool(verify_and_update_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict) -> str:
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=15)  # Access токен истекает через 15 минут
-    to_encode.update({"exp": expire})
-    auth_data = get_auth_data()
-    return jwt.encode(to_encode, auth_data['secret_key'], algorithm=auth_data['algorithm'])
+    return jwt_codec.encode(data, 'access', ACCESS_TOKEN_LIFETIME)
 
 
 def create_refresh_token(data: dict) -> str:
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=30)  # Refresh токен истекает через 30 дней
-    to_encode.update({"exp": expire})
-    auth_data = get_auth_data()
-    return jwt.encode(to_encode, auth_data['secret_key'], algorithm=auth_data['algorithm'])
+    return jwt_codec.encode(data, 'refresh', REFRESH_TOKEN_LIFETIME)
+
+
+async def issue_refresh_token(session: AsyncSession, user_id: int, family_id: str | None = None) -> str:
+    """Выдает refresh-токен и сохраняет его jti; без family_id начинается новая цепочка (вход)."""
+    jti = uuid4().hex
+    family_id = family_id or uuid4().hex
+    await RefreshTokenDAO.issue(session, jti, family_id, user_id, datetime.now(timezone.utc) + REFRESH_TOKEN_LIFETIME)
+    return create_refresh_token({"sub": str(user_id), "jti": jti, "fam": family_id})
+
+
+async def rotate_refresh_token(session: AsyncSession, payload: dict) -> str:
+    """Обменивает refresh-токен на новый из той же цепочки.
+
+    Повторное предъявление уже обмененного токена означает его утечку: отзывается вся цепочка.
+    """
+    jti, family_id = payload.get('jti'), payload.get('fam')
+    # Токены, выданные до появления ротации, не имеют jti и требуют повторного входа
+    if not jti or not family_id or RefreshTokenDAO.is_family_revoked(family_id):
+        raise TokenRevokedException
+    if not await RefreshTokenDAO.consume(session, jti):
+        await RefreshTokenDAO.revoke_family(session, family_id, datetime.now(timezone.utc) + REFRESH_TOKEN_LIFETIME)
+        # Запрос завершится ошибкой, и get_db_session откатил бы транзакцию: отзыв фиксируется явно
+        await session.commit()
+        raise TokenRevokedException
+    return await issue_refresh_token(session, int(payload['sub']), family_id)
+
+
+async def revoke_refresh_token(session: AsyncSession, token: str) -> None:
+    payload = verify_refresh_token(token)
+    if payload and payload.get('fam'):
+        await RefreshTokenDAO.revoke_family(session, payload['fam'],
+                                            datetime.now(timezone.utc) + REFRESH_TOKEN_LIFETIME)
+
+
+async def compact_refresh_tokens() -> None:
+    """Фоновая задача: загружает отозванные цепочки в кэш и периодически удаляет истекшие токены."""
+    async with async_session_maker() as session:
+        try:
+            await RefreshTokenDAO.load_revoked_families(session)
+        except SQLAlchemyError:
+            logger.exception('Не удалось загрузить отозванные refresh-токены')
+    while True:
+        async with async_session_maker() as session:
+            try:
+                await RefreshTokenDAO.compact(session)
+                await session.commit()
+            except SQLAlchemyError:
+                logger.exception('Не удалось удалить истекшие refresh-токены')
+        await asyncio.sleep(settings.REFRESH_TOKEN_COMPACT_INTERVAL)
 
 
 async def authenticate_user(session: AsyncSession, email: EmailStr, password: str):
     user = await UsersDAO.find_one_or_none(session, email=email)
-    if not user or not verify_password(plain_password=password, hashed_password=user.password):
+    if not user:
+        return None
+    verified, new_hash = await verify_and_update_password_async(password, user.password)
+    if not verified:
         return None
+    if new_hash:
+        await UsersDAO.update(session, user, password=new_hash)
     return user
 
 
 def verify_refresh_token(token: str):
     try:
-        auth_data = get_auth_data()
-        payload = jwt.decode(token, auth_data['secret_key'], algorithms=[auth_data['algorithm']])
-        return payload
+        return jwt_codec.decode(token, 'refresh')
     except JWTError:
         return None
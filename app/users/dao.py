@@ -1,16 +1,41 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import update, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
 from fastapi import HTTPException
 
+from app.cache import TTLCache
+from app.config import settings
 from app.dao.base import BaseDAO
-from app.users.models import User, Role, UserRoles
+from app.database import on_commit
+from app.users.models import User, Role, UserRoles, RefreshToken
 
+# Пользователи с загруженными ролями по id; объекты отсоединены от сессии и только читаются
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+# Отозванные цепочки refresh-токенов; источник истины — таблица refresh_tokens, кэш лишь отсекает их без запроса
+revoked_families = TTLCache(maxsize=settings.REVOKED_FAMILY_CACHE_SIZE, ttl=0)
 
 
 class UsersDAO(BaseDAO):
     model = User
 
+    @classmethod
+    async def find_principal(cls, session: AsyncSession, user_id: int) -> User | None:
+        """Пользователь вместе с ролями (UserRoles.role) из кэша или одним запросом к БД."""
+        user = principal_cache.get(user_id)
+        if user is not None:
+            return user
+
+        query = select(User).options(selectinload(User.roles).selectinload(UserRoles.role)).filter_by(id=user_id)
+        result = await session.execute(query)
+        user = result.scalar_one_or_none()
+        if user:
+            principal_cache.set(user_id, user)
+        return user
+
     @classmethod
     async def create_role(cls, session: AsyncSession, role_name: str):
         existing_role = await session.execute(select(Role).filter_by(name=role_name))
@@ -19,7 +44,7 @@ class UsersDAO(BaseDAO):
 
         new_role = Role(name=role_name)
         session.add(new_role)
-        await session.commit()
+        await session.flush()
         return new_role
 
     @classmethod
@@ -36,5 +61,70 @@ class UsersDAO(BaseDAO):
 
         user_role = UserRoles(user_id=user.id, role_id=role.id)
         session.add(user_role)
-        await session.commit()
+        await session.flush()
+        on_commit(session, lambda: principal_cache.pop(user_id))
         return {"message": f"Role '{role_name}' assigned to user {user_id}"}
+
+
+class RefreshTokenDAO(BaseDAO):
+    model = RefreshToken
+
+    @classmethod
+    def is_family_revoked(cls, family_id: str) -> bool:
+        return family_id in revoked_families
+
+    @classmethod
+    def _remember_revoked(cls, family_id: str, expires_at: datetime) -> None:
+        revoked_families.set(family_id, True, ttl=expires_at.timestamp() - time.time())
+
+    @classmethod
+    async def issue(cls, session: AsyncSession, jti: str, family_id: str, user_id: int, expires_at: datetime):
+        session.add(RefreshToken(jti=jti, family_id=family_id, user_id=user_id, expires_at=expires_at))
+        await session.flush()
+
+    @classmethod
+    async def consume(cls, session: AsyncSession, jti: str) -> bool:
+        """Помечает токен использованным; False, если он уже обменян или отозван.
+
+        Проверка и пометка выполняются одним UPDATE, поэтому токен нельзя обменять дважды
+        даже при параллельных запросах в разные процессы.
+        """
+        result = await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.jti == jti, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+            .returning(RefreshToken.jti)
+        )
+        return result.scalar_one_or_none() is not None
+
+    @classmethod
+    async def revoke_family(cls, session: AsyncSession, family_id: str, expires_at: datetime) -> None:
+        await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+        )
+        on_commit(session, lambda: cls._remember_revoked(family_id, expires_at))
+
+    @classmethod
+    async def load_revoked_families(cls, session: AsyncSession) -> int:
+        """Заполняет кэш отозванными цепочками, у которых еще есть неистекшие токены."""
+        query = (
+            select(RefreshToken.family_id, func.max(RefreshToken.expires_at))
+            .where(RefreshToken.expires_at > func.now())
+            .group_by(RefreshToken.family_id)
+            .having(func.bool_and(RefreshToken.revoked_at.isnot(None)))
+            .order_by(func.max(RefreshToken.expires_at).desc())
+            .limit(settings.REVOKED_FAMILY_CACHE_SIZE)
+        )
+        result = await session.execute(query)
+        rows = result.all()
+        for family_id, expires_at in reversed(rows):
+            cls._remember_revoked(family_id, expires_at)
+        return len(rows)
+
+    @classmethod
+    async def compact(cls, session: AsyncSession) -> int:
+        """Удаляет истекшие токены: проверка подписи их уже не пропустит."""
+        result = await session.execute(delete(RefreshToken).where(RefreshToken.expires_at < func.now()))
+        return result.rowcount
@@ -1,16 +1,15 @@
 from fastapi import Request, HTTPException, status, Depends
-from jose import jwt, JWTError
-from datetime import datetime, timezone
+from jose import JWTError, ExpiredSignatureError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, joinedload
-from sqlalchemy import select
 
-from app.config import get_auth_data
 from app.database import get_db_session
+from app.rate_limit import login_ip_limiter, login_email_limiter, client_ip
 from app.exceptions import TokenExpiredException, NoJwtException, NoUserIdException, ForbiddenException
-from app.users.auth import create_access_token
+from app.users.auth import create_access_token, rotate_refresh_token
 from app.users.dao import UsersDAO
-from app.users.models import User, UserRoles
+from app.users.models import User
+from app.users.schemas import SUserAuth
+from app.users.tokens import jwt_codec
 
 
 def get_token(request: Request, token_type: str):
@@ -28,56 +27,56 @@ def get_token(request: Request, token_type: str):
     return token
 
 
+async def rate_limited_login(request: Request, user_data: SUserAuth) -> SUserAuth:
+    """Данные для входа; перебор паролей отсекается до обращения к БД и bcrypt."""
+    await login_ip_limiter.hit(client_ip(request))
+    await login_email_limiter.hit(user_data.email.lower())
+    return user_data
+
+
 async def refresh_access_token(
     request: Request,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ):
     token = get_token(request, 'refresh')
     try:
-        auth_data = get_auth_data()
-        payload = jwt.decode(token, auth_data['secret_key'], algorithms=[auth_data['algorithm']])
+        payload = jwt_codec.decode(token, 'refresh')
+    except ExpiredSignatureError:
+        raise TokenExpiredException
     except JWTError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Invalid refresh token: {str(e)}')
 
-    expire = payload.get('exp')
-    if not expire or datetime.fromtimestamp(int(expire), tz=timezone.utc) < datetime.now(timezone.utc):
-        raise TokenExpiredException(detail='Refresh token expired')
-
     user_id = payload.get('sub')
     if not user_id:
-        raise NoUserIdException(detail='No user ID in token')
+        raise NoUserIdException
 
     user = await UsersDAO.find_one_or_none_by_id(session, int(user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
 
+    new_refresh_token = await rotate_refresh_token(session, payload)
     new_access_token = create_access_token({"sub": str(user.id)})
-    return {"access_token": new_access_token}
+    return {"access_token": new_access_token, "refresh_token": new_refresh_token}
 
 
 async def get_current_user(
     request: Request,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> User:
     token = get_token(request, 'access')
     try:
-        auth_data = get_auth_data()
-        payload = jwt.decode(token, auth_data['secret_key'], algorithms=[auth_data['algorithm']])
+        payload = jwt_codec.decode(token, 'access')
+    except ExpiredSignatureError:
+        raise TokenExpiredException
     except JWTError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Invalid access token: {str(e)}')
 
-    expire = payload.get('exp')
-    if not expire or datetime.fromtimestamp(int(expire), tz=timezone.utc) < datetime.now(timezone.utc):
-        raise TokenExpiredException(detail='Access token expired')
-
     user_id = payload.get('sub')
     if not user_id:
-        raise NoUserIdException(detail='No user ID in token')
+        raise NoUserIdException
 
-    # Загрузка пользователя с жадной загрузкой его ролей
-    query = select(User).options(selectinload(User.roles)).where(User.id == int(user_id))
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
+    # Пользователь с ролями берется из кэша, в БД идем только при промахе
+    user = await UsersDAO.find_principal(session, int(user_id))
 
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
@@ -85,33 +84,15 @@ async def get_current_user(
     return user
 
 
-async def get_current_admin_user(
-    current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session)
-) -> User:
-    query = select(User).options(
-        joinedload(User.roles).joinedload(UserRoles.role)
-    ).where(User.id == current_user.id)
-    result = await session.execute(query)
-    user = result.unique().scalar_one_or_none()
-
-    if not user or not user.is_admin:
+async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    return user
+    return current_user
 
 
-async def get_current_farmer_user(
-    current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session)
-) -> User:
-    query = select(User).options(
-        joinedload(User.roles).joinedload(UserRoles.role)
-    ).where(User.id == current_user.id)
-    result = await session.execute(query)
-    user = result.unique().scalar_one_or_none()
-
-    if not user or not any(role.name == 'farmer' for role in user.roles):
+async def get_current_farmer_user(current_user: User = Depends(get_current_user)) -> User:
+    if not any(user_role.role.name == 'farmer' for user_role in current_user.roles):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    return user
+    return current_user
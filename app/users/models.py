@@ -1,4 +1,6 @@
-from sqlalchemy import ForeignKey, UniqueConstraint
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, UniqueConstraint, String, DateTime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base, str_uniq, int_pk
 
@@ -47,3 +49,15 @@ class UserRoles(Base):
 
     user = relationship("User", back_populates="roles")
     role = relationship("Role", back_populates="users")
+
+
+# Выданные refresh-токены: jti — id токена, family_id — цепочка токенов, полученных ротацией от одного входа
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    jti: Mapped[str] = mapped_column(String(32), primary_key=True)
+    family_id: Mapped[str] = mapped_column(String(32), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    # Заполняется, когда токен обменян на новый или отозван
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
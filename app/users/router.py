@@ -1,13 +1,14 @@
 from fastapi import APIRouter, HTTPException, status, Response, Depends, Request
-from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db_session
-from app.users.auth import get_password_hash, authenticate_user, create_access_token, create_refresh_token
+from app.database import get_db_session, get_read_session
+from app.users.auth import (get_password_hash_async, authenticate_user, create_access_token, issue_refresh_token,
+                            revoke_refresh_token)
 from app.users.dao import UsersDAO
-from app.users.dependencies import get_current_user, get_current_admin_user, refresh_access_token
+from app.users.dependencies import get_current_user, get_current_admin_user, refresh_access_token, rate_limited_login
 from app.users.models import User
 from app.users.schemas import SUserRegister, SUserAuth
+from app.users.tokens import jwt_codec
 
 router = APIRouter(prefix='/auth', tags=['Аутентификация'])
 
@@ -15,33 +16,27 @@ router = APIRouter(prefix='/auth', tags=['Аутентификация'])
 @router.post("/register/", summary="Зарегистрировать пользователя")
 async def register_user(
     user_data: SUserRegister,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ) -> dict:
-    try:
-        validated_data = SUserRegister(**user_data.dict())
-    except ValidationError as e:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=[{"msg": err["msg"], "loc": err["loc"]} for err in e.errors()]
-        )
-
-    user = await UsersDAO.find_one_or_none(session, email=validated_data.email)
+    # Тело запроса уже проверено FastAPI по схеме SUserRegister
+    user = await UsersDAO.find_one_or_none(session, email=user_data.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Пользователь уже существует"
         )
 
-    validated_data.password = get_password_hash(validated_data.password)
-    await UsersDAO.add(session, **validated_data.dict())
+    user_dict = user_data.model_dump()
+    user_dict['password'] = await get_password_hash_async(user_data.password)
+    await UsersDAO.add(session, **user_dict)
     return {'message': 'Вы успешно зарегистрированы!'}
 
 
 @router.post("/login/", summary="Аутентифицировать пользователя")
 async def auth_user(
     response: Response,
-    user_data: SUserAuth,
-    session: AsyncSession = Depends(get_db_session)
+    user_data: SUserAuth = Depends(rate_limited_login),
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ):
     check = await authenticate_user(session, email=user_data.email, password=user_data.password)
     if check is None:
@@ -49,7 +44,7 @@ async def auth_user(
                             detail='Неверная почта или пароль')
 
     access_token = create_access_token({"sub": str(check.id)})
-    refresh_token = create_refresh_token({"sub": str(check.id)})
+    refresh_token = await issue_refresh_token(session, check.id)
 
     response.set_cookie(key="users_access_token", value=access_token, httponly=True)
     response.set_cookie(key="users_refresh_token", value=refresh_token, httponly=True)
@@ -61,18 +56,29 @@ async def auth_user(
 async def refresh_access_token_route(
     request: Request,
     response: Response,
-    session: AsyncSession = Depends(get_db_session)
+    session: AsyncSession = Depends(get_db_session, scope="function")
 ):
     token_data = await refresh_access_token(request, session)
-    new_access_token = token_data["access_token"]
 
-    response.set_cookie(key="users_access_token", value=new_access_token, httponly=True)
+    response.set_cookie(key="users_access_token", value=token_data["access_token"], httponly=True)
+    response.set_cookie(key="users_refresh_token", value=token_data["refresh_token"], httponly=True)
+
+    return token_data
+
 
-    return {"access_token": new_access_token}
+@router.get("/public_key/", summary="Открытый ключ для проверки токенов другими сервисами")
+async def get_public_key() -> dict:
+    if not jwt_codec.is_asymmetric:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Токены подписываются симметричным ключом')
+    return {'algorithm': jwt_codec.algorithm, 'public_key': jwt_codec.verification_key}
 
 
 @router.post("/logout/", summary="Разлогинить пользователя")
-async def logout_user(response: Response):
+async def logout_user(request: Request, response: Response,
+                      session: AsyncSession = Depends(get_db_session, scope="function")):
+    refresh_token = request.cookies.get('users_refresh_token')
+    if refresh_token:
+        await revoke_refresh_token(session, refresh_token)
     response.delete_cookie(key="users_access_token")
     response.delete_cookie(key="users_refresh_token")
     return {'message': 'Пользователь успешно вышел из системы'}
@@ -87,7 +93,7 @@ async def get_me(
 
 @router.get("/all_users/", summary="Получить информацию о всех пользователях")
 async def get_all_users(
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_session),
     user_data: User = Depends(get_current_admin_user)
 ):
     return await UsersDAO.find_all(session)
@@ -96,7 +102,7 @@ async def get_all_users(
 @router.post("/roles/", summary="Добавить новую роль")
 async def create_role(
     role_name: str,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_db_session, scope="function"),
     current_user: User = Depends(get_current_admin_user)
 ):
     try:
@@ -109,7 +115,7 @@ async def create_role(
 @router.delete("/roles/{role_id}", summary="Удалить роль")
 async def delete_role(
     role_id: int,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_db_session, scope="function"),
     current_user: User = Depends(get_current_admin_user)
 ):
     try:
@@ -122,7 +128,7 @@ async def delete_role(
 async def update_user_role(
     user_id: int,
     role_name: str,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_db_session, scope="function"),
     current_user: User = Depends(get_current_admin_user)
 ):
     try:
@@ -0,0 +1,62 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from jose import jwt, JWTError
+
+from app.cache import TTLCache
+from app.config import settings
+
+ASYMMETRIC_ALGORITHMS = ('RS', 'PS', 'ES')
+
+
+def _read_key(path: str | None, name: str) -> str:
+    if not path:
+        raise ValueError(f"Для алгоритма {settings.ALGORITHM} нужно задать {name}")
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+class JWTCodec:
+    """Выпуск и проверка JWT: ключи загружаются один раз, проверенные токены кэшируются до истечения."""
+
+    def __init__(self, algorithm: str, signing_key: str, verification_key: str, cache_size: int):
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.verification_key = verification_key
+        self._verified = TTLCache(maxsize=cache_size, ttl=0)
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return self.algorithm.startswith(ASYMMETRIC_ALGORITHMS)
+
+    def encode(self, data: dict, token_type: str, expires_in: timedelta) -> str:
+        to_encode = {**data, 'type': token_type, 'exp': datetime.now(timezone.utc) + expires_in}
+        return jwt.encode(to_encode, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str, token_type: str) -> dict:
+        """Payload проверенного токена; истекший или чужой токен вызывает JWTError.
+
+        Возвращаемый словарь общий для всех запросов с этим токеном, изменять его нельзя.
+        """
+        payload = self._verified.get(token)
+        if payload is None:
+            payload = jwt.decode(token, self.verification_key, algorithms=[self.algorithm],
+                                 options={'require_exp': True})
+            self._verified.set(token, payload, ttl=payload['exp'] - time.time())
+        # Токены, выпущенные до появления claim type, считаются access-токенами: принимать их как refresh нельзя,
+        # иначе любой старый access-токен позволял бы выпускать новые пары токенов
+        if payload.get('type', 'access') != token_type:
+            raise JWTError(f'Expected {token_type} token')
+        return payload
+
+
+def create_jwt_codec() -> JWTCodec:
+    if settings.ALGORITHM.startswith(ASYMMETRIC_ALGORITHMS):
+        signing_key = _read_key(settings.JWT_PRIVATE_KEY_FILE, 'JWT_PRIVATE_KEY_FILE')
+        verification_key = _read_key(settings.JWT_PUBLIC_KEY_FILE, 'JWT_PUBLIC_KEY_FILE')
+    else:
+        signing_key = verification_key = settings.SECRET_KEY
+    return JWTCodec(settings.ALGORITHM, signing_key, verification_key, settings.TOKEN_CACHE_SIZE)
+
+
+jwt_codec = create_jwt_codec()
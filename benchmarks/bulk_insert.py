@@ -0,0 +1,75 @@
+"""Пропускная способность загрузки полей: по одной строке на транзакцию против FieldsDAO.bulk_add.
+
+    python -m benchmarks.bulk_insert              — 2000 полей каждым способом
+    python -m benchmarks.bulk_insert --rows 10000
+
+Нужна база из настроек с примененными миграциями. Поля создаются у временного фермера
+и удаляются после замера.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date
+
+from sqlalchemy import delete
+
+from app.database import async_session_maker
+from app.farmers.dao import FarmerDAO
+from app.farmers.models import Farmer
+from app.fields.dao import FieldsDAO
+from app.fields.models import Field
+
+PREFIX = 'bench-bulk-'
+
+
+def field_rows(rows: int, farmer_id: int, label: str) -> list[dict]:
+    result = []
+    for i in range(rows):
+        lat, lon = 54 + (i // 1000) * 0.005, 37 + (i % 1000) * 0.005
+        coordinates = json.dumps([{'lat': lat, 'lon': lon}, {'lat': lat + 0.003, 'lon': lon},
+                                  {'lat': lat + 0.003, 'lon': lon + 0.004}])
+        result.append({'name': f'{PREFIX}{label}-{i}', 'area_hectares': 5 + i % 200,
+                       'crop_rotation': f'Севооборот {i % 50}', 'cultivation_technology': None,
+                       'coordinates': coordinates, 'farmer_id': farmer_id})
+    return result
+
+
+async def single_rows(rows: list[dict]) -> None:
+    """Прежний путь: каждая строка — отдельный запрос к API со своей сессией и commit."""
+    for row in rows:
+        async with async_session_maker() as session:
+            await FieldsDAO.add(session, **row)
+            await session.commit()
+
+
+async def bulk(rows: list[dict]) -> None:
+    async with async_session_maker() as session:
+        await FieldsDAO.bulk_add(session, rows)
+        await session.commit()
+
+
+async def main(rows: int) -> None:
+    async with async_session_maker() as session:
+        farmer = await FarmerDAO.add(session, phone_number='+70000000000', first_name='Бенч', last_name='Бенч',
+                                     farm_name='Бенч', date_of_birth=date(1980, 1, 1),
+                                     email=f'{PREFIX}farmer@example.com', address='Адрес для замера')
+        farmer_id = farmer.id
+        await session.commit()
+    try:
+        for name, load in (('по одной строке', single_rows), ('bulk_add', bulk)):
+            started = time.perf_counter()
+            await load(field_rows(rows, farmer_id, name.replace(' ', '-')))
+            elapsed = time.perf_counter() - started
+            print(f'{name:<16} {rows} полей за {elapsed:.2f} с: {rows / elapsed:,.0f} строк/с')
+    finally:
+        async with async_session_maker() as session:
+            await session.execute(delete(Field).where(Field.name.startswith(PREFIX)))
+            await session.execute(delete(Farmer).where(Farmer.id == farmer_id))
+            await session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000, help='число полей для каждого способа')
+    asyncio.run(main(parser.parse_args().rows))
@@ -0,0 +1,83 @@
+"""Время ожидания соединения из пула при разных настройках DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_PRE_PING.
+
+    python -m benchmarks.db_pool                          — 50 клиентов, по 40 запросов, запрос к БД 10 мс
+    python -m benchmarks.db_pool --clients 100 --query-ms 20
+
+Нужна база из настроек. Для каждой конфигурации создается свой движок с тем же пулом, что в app.database
+(MeasuredQueuePool), клиенты параллельно берут соединение и выполняют SELECT pg_sleep. Ожидание —
+время от запроса соединения до его получения, как в метрике db_pool_wait_seconds_total.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import get_db_url, settings
+from app.database import MeasuredQueuePool
+
+# (pool_size, max_overflow, pool_pre_ping)
+CONFIGS = (
+    (5, 0, True),
+    (10, 5, True),
+    (10, 5, False),
+    (20, 10, True),
+    (50, 0, True),
+)
+
+
+async def run_config(pool_size: int, max_overflow: int, pre_ping: bool,
+                     clients: int, requests: int, query_seconds: float) -> dict:
+    engine = create_async_engine(get_db_url(), poolclass=MeasuredQueuePool, pool_size=pool_size,
+                                 max_overflow=max_overflow, pool_pre_ping=pre_ping,
+                                 pool_timeout=settings.DB_POOL_TIMEOUT)
+    waits, timeouts = [], 0
+    # Соединения открываются заранее, чтобы в ожидание не попало установление соединений
+    connections = await asyncio.gather(*(engine.connect().start() for _ in range(pool_size)))
+    for connection in connections:
+        await connection.close()
+
+    async def client():
+        nonlocal timeouts
+        for _ in range(requests):
+            started = time.perf_counter()
+            try:
+                async with engine.connect() as connection:
+                    waits.append(time.perf_counter() - started)
+                    await connection.execute(text('SELECT pg_sleep(:seconds)'), {'seconds': query_seconds})
+            except PoolTimeoutError:
+                timeouts += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    waits.sort()
+    return {
+        'p50': statistics.median(waits) * 1000,
+        'p99': waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000,
+        'max': waits[-1] * 1000,
+        'rps': len(waits) / elapsed,
+        'timeouts': timeouts,
+    }
+
+
+async def main(clients: int, requests: int, query_ms: float) -> None:
+    print(f'{clients} клиентов по {requests} запросов, запрос к БД {query_ms:g} мс')
+    for pool_size, max_overflow, pre_ping in CONFIGS:
+        result = await run_config(pool_size, max_overflow, pre_ping, clients, requests, query_ms / 1000)
+        print(f'pool_size={pool_size:<3} max_overflow={max_overflow:<3} pre_ping={pre_ping!s:<5}: '
+              f'ожидание p50 {result["p50"]:.1f} мс, p99 {result["p99"]:.1f} мс, max {result["max"]:.1f} мс; '
+              f'{result["rps"]:.0f} запросов/с, таймаутов {result["timeouts"]}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=50, help='одновременных клиентов')
+    parser.add_argument('--requests', type=int, default=40, help='запросов на клиента')
+    parser.add_argument('--query-ms', type=float, default=10, help='длительность запроса к БД, мс')
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.requests, args.query_ms))
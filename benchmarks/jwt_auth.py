@@ -0,0 +1,107 @@
+"""Проверка JWT: кэш проверенных токенов JWTCodec против декодирования на каждый запрос.
+
+    python -m benchmarks.jwt_auth                         — 20000 проверок токена, 2000 запросов к /auth/me/
+    python -m benchmarks.jwt_auth --decodes 50000 --requests 5000
+
+Первая часть БД не требует: один и тот же токен проверяется кодеком с кэшем и без него (TOKEN_CACHE_SIZE=0)
+для HS256 и RS256 (ключ RSA 2048 создается на время замера). Вторая часть отправляет GET /auth/me/
+через ASGI-транспорт httpx в роутер пользователей; нужна база из настроек, временный пользователь
+удаляется после замера. Пользователь с ролями берется из principal_cache, так что в запросах
+к /auth/me/ разница — только проверка токена.
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+
+import httpx
+import rsa
+from fastapi import FastAPI
+from sqlalchemy import delete
+
+import app.users.dependencies as dependencies
+from app.config import settings
+from app.database import async_session_maker
+from app.users.models import User
+from app.users.router import router as users_router
+from app.users.tokens import JWTCodec
+
+TOKEN_LIFETIME = timedelta(minutes=15)
+CONCURRENCY = 10
+
+
+def make_codecs(algorithm: str) -> tuple[JWTCodec, JWTCodec]:
+    """Кодеки без кэша и с кэшем для алгоритма."""
+    if algorithm == 'HS256':
+        signing_key = verification_key = settings.SECRET_KEY
+    else:
+        public_key, private_key = rsa.newkeys(2048)
+        signing_key, verification_key = private_key.save_pkcs1().decode(), public_key.save_pkcs1().decode()
+    return (JWTCodec(algorithm, signing_key, verification_key, cache_size=0),
+            JWTCodec(algorithm, signing_key, verification_key, cache_size=settings.TOKEN_CACHE_SIZE))
+
+
+def decodes_per_second(codec: JWTCodec, token: str, decodes: int) -> float:
+    started = time.perf_counter()
+    for _ in range(decodes):
+        codec.decode(token, 'access')
+    return decodes / (time.perf_counter() - started)
+
+
+async def requests_per_second(client: httpx.AsyncClient, requests: int) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def get_me():
+        async with semaphore:
+            response = await client.get('/auth/me/')
+            assert response.status_code == 200, response.text
+
+    await get_me()
+    started = time.perf_counter()
+    await asyncio.gather(*(get_me() for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def measure_endpoint(requests: int) -> None:
+    async with async_session_maker() as session:
+        user = User(phone_number='+70000000016', first_name='Бенч', last_name='Бенч',
+                    email='bench-jwt@example.com', password='-')
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+    app = FastAPI()
+    app.include_router(users_router)
+    original = dependencies.jwt_codec
+    try:
+        for algorithm in ('HS256', 'RS256'):
+            uncached, cached = make_codecs(algorithm)
+            token = cached.encode({'sub': str(user_id)}, 'access', TOKEN_LIFETIME)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench',
+                                         cookies={'users_access_token': token}) as client:
+                for name, codec in (('без кэша', uncached), ('с кэшем', cached)):
+                    dependencies.jwt_codec = codec
+                    print(f'GET /auth/me/ ({algorithm}, {name}): '
+                          f'{await requests_per_second(client, requests):,.0f} запросов/с')
+    finally:
+        dependencies.jwt_codec = original
+        async with async_session_maker() as session:
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+
+
+def main(decodes: int, requests: int) -> None:
+    for algorithm in ('HS256', 'RS256'):
+        uncached, cached = make_codecs(algorithm)
+        token = cached.encode({'sub': '1'}, 'access', TOKEN_LIFETIME)
+        count = decodes if algorithm == 'HS256' else decodes // 10
+        print(f'{algorithm}: без кэша {decodes_per_second(uncached, token, count):,.0f} проверок/с, '
+              f'с кэшем {decodes_per_second(cached, token, count):,.0f} проверок/с')
+    asyncio.run(measure_endpoint(requests))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--decodes', type=int, default=20000, help='проверок токена HS256 (RS256 — в 10 раз меньше)')
+    parser.add_argument('--requests', type=int, default=2000, help='запросов к /auth/me/ для каждого варианта')
+    args = parser.parse_args()
+    main(args.decodes, args.requests)
@@ -0,0 +1,118 @@
+"""Задержка постороннего эндпоинта во время шторма входов: bcrypt в цикле событий против пула хеширования.
+
+    python -m benchmarks.login_storm                       — 100 входов, по 20 одновременно
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+
+БД не нужна: приложение из трех маршрутов вызывается через ASGI-транспорт httpx в одном цикле событий.
+/login/blocking проверяет пароль прежним путем (verify_and_update_password прямо в обработчике),
+/login/pool — через verify_and_update_password_async. Пока идут входы, /ping запрашивается
+каждые 5 мс, и по его задержкам считаются p50/p99/max.
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.config import settings
+from app.users.auth import get_password_hash, verify_and_update_password, verify_and_update_password_async
+
+PASSWORD = 'correct horse battery staple'
+PROBE_INTERVAL = 0.005
+
+
+def make_app(hashed_password: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/ping')
+    async def ping():
+        return {}
+
+    @app.post('/login/blocking')
+    async def login_blocking():
+        return {'ok': verify_and_update_password(PASSWORD, hashed_password)[0]}
+
+    @app.post('/login/pool')
+    async def login_pool():
+        return {'ok': (await verify_and_update_password_async(PASSWORD, hashed_password))[0]}
+
+    return app
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Future) -> list[float]:
+    """Задержки /ping в миллисекундах, пока stop не получит момент окончания нагрузки.
+
+    Запросы планируются каждые PROBE_INTERVAL и не ждут друг друга, задержка считается от запланированного
+    момента: если цикл событий заблокирован, опоздавшие запросы учитываются, а не пропадают из замеров.
+    """
+    latencies = []
+
+    async def ping(scheduled: float):
+        await client.get('/ping')
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+
+    started = time.perf_counter()
+    pings = []
+    for tick in itertools.count():
+        scheduled = started + tick * PROBE_INTERVAL
+        if stop.done() and scheduled > stop.result():
+            break
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        pings.append(asyncio.create_task(ping(scheduled)))
+    await asyncio.gather(*pings)
+    return latencies
+
+
+async def storm(client: httpx.AsyncClient, path: str, logins: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            response = await client.post(path)
+            assert response.json() == {'ok': True}
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def measure(client: httpx.AsyncClient, path: str | None, logins: int, concurrency: int) -> tuple[list, float]:
+    """Задержки /ping во время шторма входов на path (без path — 1 секунда без нагрузки) и длительность шторма."""
+    stop = asyncio.get_running_loop().create_future()
+    probe_task = asyncio.create_task(probe(client, stop))
+    started = time.perf_counter()
+    if path:
+        await storm(client, path, logins, concurrency)
+    else:
+        await asyncio.sleep(1)
+    stop.set_result(time.perf_counter())
+    return await probe_task, stop.result() - started
+
+
+def percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def main(logins: int, concurrency: int) -> None:
+    hashed_password = get_password_hash(PASSWORD)
+    transport = httpx.ASGITransport(app=make_app(hashed_password))
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        print(f'bcrypt rounds={settings.BCRYPT_ROUNDS}, воркеров пула: {settings.PASSWORD_HASH_WORKERS} '
+              f'({settings.PASSWORD_HASH_EXECUTOR}); {logins} входов, по {concurrency} одновременно')
+        for name, path in (('без нагрузки', None), ('bcrypt в цикле событий', '/login/blocking'),
+                           ('пул хеширования', '/login/pool')):
+            latencies, elapsed = await measure(client, path, logins, concurrency)
+            storm_info = f', входов/с {logins / elapsed:.0f}' if path else ''
+            print(f'{name:>24}: /ping p50 {statistics.median(latencies):.1f} мс, '
+                  f'p99 {percentile(latencies, 0.99):.1f} мс, max {max(latencies):.1f} мс '
+                  f'({len(latencies)} запросов{storm_info})')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=100, help='число входов в шторме')
+    parser.add_argument('--concurrency', type=int, default=20, help='одновременных входов')
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency))
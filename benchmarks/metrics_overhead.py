@@ -0,0 +1,126 @@
+"""Накладные расходы метрик: MetricsMiddleware + QueryCountMiddleware на запрос и подписки на события движка на SQL.
+
+    python -m benchmarks.metrics_overhead                 — 20000 HTTP-запросов и 5000 SQL-запросов, 10 повторов
+    python -m benchmarks.metrics_overhead --requests 50000 --queries 20000
+
+HTTP-часть БД не требует: ASGI-приложение FastAPI вызывается напрямую, без сети и клиента, чтобы разница
+не терялась в шуме транспорта. SQL-часть выполняет SELECT 1 через два движка из настроек: без подписок
+и с instrument_engine + track_queries при открытом журнале запросов, как внутри HTTP-запроса.
+В конце замеряется время одной выдачи /metrics (render_metrics) по накопленным рядам.
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import get_db_url
+from app.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from app.query_counter import QueryCountMiddleware, QueryLog, current_log, track_queries
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/items/{item_id}')
+    async def get_item(item_id: int):
+        return {'id': item_id}
+
+    if instrumented:
+        app.add_middleware(QueryCountMiddleware)
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def call(app, path: str) -> None:
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+             'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'', 'headers': [],
+             'client': ('127.0.0.1', 1), 'server': ('bench', 80)}
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def best_microseconds(variants: dict, count: int, repeat: int) -> dict[str, float]:
+    """Лучшее среднее время одного вызова каждого варианта; варианты чередуются в каждом прогоне,
+    чтобы фоновая нагрузка на машину сказывалась на них одинаково."""
+    best = dict.fromkeys(variants, float('inf'))
+    for _ in range(repeat):
+        for name, func in variants.items():
+            started = time.perf_counter()
+            for index in range(count):
+                await func(index)
+            best[name] = min(best[name], (time.perf_counter() - started) / count)
+    return {name: seconds * 1_000_000 for name, seconds in best.items()}
+
+
+def report(kind: str, micros: dict[str, float]) -> None:
+    plain, instrumented = micros['без метрик'], micros['с метриками']
+    print(f'{kind}: без метрик {plain:.1f} мкс, с метриками {instrumented:.1f} мкс '
+          f'(+{instrumented - plain:.1f} мкс, {(instrumented / plain - 1) * 100:+.0f}%)')
+
+
+async def measure_http(requests: int, repeat: int) -> None:
+    apps = {'без метрик': make_app(False), 'с метриками': make_app(True)}
+    for app in apps.values():
+        # Первый вызов собирает стек middleware
+        await call(app, '/items/0')
+    variants = {name: (lambda index, app=app: call(app, f'/items/{index % 1000}')) for name, app in apps.items()}
+    report('HTTP-запрос', await best_microseconds(variants, requests, repeat))
+
+
+async def measure_sql(queries: int, repeat: int) -> None:
+    plain = create_async_engine(get_db_url(), poolclass=NullPool)
+    instrumented = create_async_engine(get_db_url(), poolclass=NullPool)
+    instrument_engine(instrumented, 'bench')
+    track_queries(instrumented)
+    statement = text('SELECT 1')
+    engines = {'без метрик': plain, 'с метриками': instrumented}
+    best = dict.fromkeys(engines, float('inf'))
+    token = current_log.set(QueryLog())
+    try:
+        # Время SELECT 1 заметно зависит от серверного процесса, поэтому в каждом прогоне
+        # открываются новые соединения, и берется лучший прогон
+        for _ in range(repeat):
+            for name, engine in engines.items():
+                async with engine.connect() as connection:
+                    await connection.execute(statement)
+                    micros = await best_microseconds({name: lambda index: connection.execute(statement)}, queries, 1)
+                best[name] = min(best[name], micros[name])
+        report('SQL-запрос ', best)
+    finally:
+        current_log.reset(token)
+        await plain.dispose()
+        await instrumented.dispose()
+
+
+def measure_render(repeat: int) -> None:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = render_metrics()
+        best = min(best, time.perf_counter() - started)
+    print(f'render_metrics: {best * 1000:.2f} мс, {len(body.splitlines())} строк')
+
+
+async def main(requests: int, queries: int, repeat: int) -> None:
+    await measure_http(requests, repeat)
+    await measure_sql(queries, repeat)
+    measure_render(repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000, help='HTTP-запросов в одном прогоне')
+    parser.add_argument('--queries', type=int, default=5000, help='SQL-запросов в одном прогоне')
+    parser.add_argument('--repeat', type=int, default=10, help='число прогонов, берется лучшее время')
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.queries, args.repeat))
@@ -0,0 +1,103 @@
+"""Нечеткий поиск FarmerDAO.search / FieldsDAO.search на 100k+ строк: триграммный индекс против полного чтения.
+
+    python -m benchmarks.search                           — 100000 фермеров и 120000 полей, 20 повторов
+    python -m benchmarks.search --farmers 200000 --fields 300000 --repeat 50
+
+Нужна база из настроек с примененными миграциями. Данные создаются внутри одной транзакции и
+откатываются после замера. Фамилии и названия — случайные строки из md5, поэтому триграммы
+распределены как у настоящих имен, а не повторяются в каждой строке. Для каждого вида запроса
+(начало слова, подстрока, опечатка) берется медиана времени с индексом ix_*_search_text и после
+его удаления в той же транзакции.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.farmers.dao import FarmerDAO
+from app.fields.dao import FieldsDAO
+
+# md5 в шестнадцатеричном виде, переведенный в кириллицу: случайные «слова» длиной 8-10 букв
+WORD_SQL = "translate(substr(md5({seed}), {start}, {length}), '0123456789abcdef', 'абвгдеклмнопрсту')"
+
+SEED_SQL = (
+    f"""
+    INSERT INTO farmers (phone_number, first_name, last_name, date_of_birth, email, address, farm_name)
+    SELECT '+7' || lpad(n::text, 10, '0'), initcap({WORD_SQL.format(seed="'и' || n % 5000", start=1, length=7)}),
+           initcap({WORD_SQL.format(seed='n::text', start=1, length=9)}), DATE '1980-01-01',
+           'search' || n || '@example.com', 'Адрес ' || n,
+           'КФХ ' || initcap({WORD_SQL.format(seed='n::text', start=10, length=10)})
+    FROM generate_series(1, :farmers) AS n
+    """,
+    f"""
+    INSERT INTO fields (name, area_hectares, crop_rotation, farmer_id)
+    SELECT 'Поле ' || initcap({WORD_SQL.format(seed="'п' || n", start=1, length=9)}) || ' ' || n, 10,
+           initcap({WORD_SQL.format(seed="'с' || n % 500", start=1, length=8)}) || ' - '
+           || {WORD_SQL.format(seed="'т' || n % 500", start=1, length=8)},
+           (SELECT min(id) FROM farmers WHERE email LIKE 'search%') + n % :farmers
+    FROM generate_series(1, :fields) AS n
+    """,
+    'ANALYZE farmers, fields',
+)
+
+
+def queries(word: str) -> dict[str, str]:
+    """Виды запросов по существующему слову: начало слова, подстрока из середины, опечатка в последней букве."""
+    return {
+        'начало слова': word[:5],
+        'подстрока': word[2:7],
+        'опечатка': word[:-1] + ('б' if word[-1] == 'а' else 'а'),
+    }
+
+
+async def median_ms(session: AsyncSession, dao, query: str, repeat: int) -> tuple[float, int]:
+    found = len(await dao.search(session, query))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await dao.search(session, query)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, found
+
+
+async def main(farmers: int, fields: int, repeat: int) -> None:
+    async with async_session_maker() as session:
+        started = time.perf_counter()
+        for statement in SEED_SQL:
+            await session.execute(text(statement), {'farmers': farmers, 'fields': fields})
+        print(f'Создано {farmers} фермеров и {fields} полей за {time.perf_counter() - started:.0f} с')
+
+        words = {
+            FarmerDAO: (await session.execute(text(
+                "SELECT last_name FROM farmers WHERE email = 'search777@example.com'"))).scalar_one(),
+            FieldsDAO: (await session.execute(text(
+                "SELECT split_part(name, ' ', 2) FROM fields ORDER BY id DESC LIMIT 1"))).scalar_one(),
+        }
+        results = {}
+        for indexed in (True, False):
+            if not indexed:
+                await session.execute(text('DROP INDEX ix_farmers_search_text'))
+                await session.execute(text('DROP INDEX ix_fields_search_text'))
+            for dao, word in words.items():
+                for kind, query in queries(word).items():
+                    results[dao, kind, indexed] = await median_ms(session, dao, query, repeat)
+        await session.rollback()
+
+    for dao, word in words.items():
+        for kind, query in queries(word).items():
+            (with_index, found), (without_index, _) = results[dao, kind, True], results[dao, kind, False]
+            print(f'{dao.model.__tablename__:<8} {kind:<14} {query!r:<14}: индекс {with_index:.1f} мс, '
+                  f'без индекса {without_index:.1f} мс, найдено {found}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--farmers', type=int, default=100_000, help='число фермеров')
+    parser.add_argument('--fields', type=int, default=120_000, help='число полей')
+    parser.add_argument('--repeat', type=int, default=20, help='повторов каждого запроса, берется медиана')
+    args = parser.parse_args()
+    asyncio.run(main(args.farmers, args.fields, args.repeat))
@@ -0,0 +1,77 @@
+"""Микробенчмарк сериализации списков полей: прежний путь ответа против json_list_response.
+
+    python -m benchmarks.serialization                 — 20000 полей, 5 повторов
+    python -m benchmarks.serialization --rows 50000 --repeat 10
+
+БД не нужна: поля создаются в памяти как ORM-объекты, так же как их возвращает FieldsDAO.find_fields.
+Прежний путь: to_dict() с фермером, проверка по response_model, json.dumps.
+"""
+import argparse
+import json
+import time
+from datetime import date
+
+from fastapi.encoders import jsonable_encoder
+
+from app.farmers.models import Farmer
+from app.fields.models import Field
+from app.fields.schemas import SField
+from app.serialization import _list_adapter, dump_list_json
+
+
+def make_fields(rows: int) -> list[Field]:
+    farmers = [Farmer(id=i, first_name=f'Имя{i}', last_name=f'Фамилия{i}', farm_name=f'Хозяйство {i}',
+                      phone_number=f'+7900{i:07d}', email=f'farmer{i}@example.com',
+                      date_of_birth=date(1970, 1, 1), address=f'Адрес {i}')
+               for i in range(1, rows // 10 + 2)]
+    fields = []
+    for i in range(1, rows + 1):
+        lat, lon = 54 + (i // 1000) * 0.005, 37 + (i % 1000) * 0.005
+        coordinates = json.dumps([{'lat': lat, 'lon': lon}, {'lat': lat + 0.003, 'lon': lon},
+                                  {'lat': lat + 0.003, 'lon': lon + 0.004}, {'lat': lat, 'lon': lon + 0.004}])
+        fields.append(Field(id=i, name=f'Поле {i}', area_hectares=5 + i % 200, crop_rotation=f'Севооборот {i % 50}',
+                            cultivation_technology=f'Технология {i % 20}', coordinates=coordinates,
+                            farmer_id=farmers[i // 10].id, farmer=farmers[i // 10]))
+    return fields
+
+
+def legacy_response(fields: list[Field]) -> bytes:
+    """Прежний путь: словари из to_dict(), проверка по response_model и кодирование в FastAPI, json.dumps."""
+    rows = []
+    for field in fields:
+        field_dict = field.to_dict()
+        field_dict['farmer'] = field.farmer.last_name if field.farmer else None
+        field_dict['updated_at'] = field.updated_at
+        rows.append(field_dict)
+    adapter = _list_adapter(SField)
+    content = jsonable_encoder(adapter.dump_python(adapter.validate_python(rows), mode='json'))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def measure(func, fields: list[Field], repeat: int) -> float:
+    """Лучшее время одного вызова в миллисекундах."""
+    func(fields)
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(fields)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='число полей в ответе')
+    parser.add_argument('--repeat', type=int, default=5, help='число повторов, берется лучшее время')
+    args = parser.parse_args()
+
+    fields = make_fields(args.rows)
+    assert json.loads(legacy_response(fields)) == json.loads(dump_list_json(fields, SField))
+    legacy = measure(legacy_response, fields, args.repeat)
+    current = measure(lambda rows: dump_list_json(rows, SField), fields, args.repeat)
+    print(f'{args.rows} полей: прежний путь {legacy:.0f} мс, json_list_response {current:.0f} мс '
+          f'(в {legacy / current:.1f} раза быстрее)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Общие фикстуры тестов.
+
+Тесты с фикстурой db_engine/db_session работают с базой из настроек (.env или переменные окружения DB_*),
+к которой применены миграции (alembic upgrade head). Если база недоступна, такие тесты пропускаются.
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import get_db_url
+from app.database import get_db_session, get_read_session
+from app.farmers.router import router as farmers_router
+from app.fields.router import router as fields_router
+from app.query_counter import track_queries
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+async def _check_database(engine) -> None:
+    async with engine.connect() as connection:
+        await connection.execute(text('SELECT 1 FROM farmers LIMIT 1'))
+
+
+@pytest.fixture(scope='session')
+def db_engine():
+    # NullPool: соединение живет в одном цикле событий, а у anyio и TestClient циклы свои
+    engine = create_async_engine(get_db_url(), poolclass=NullPool, connect_args={'timeout': 5})
+    try:
+        asyncio.run(_check_database(engine))
+    except (OSError, asyncio.TimeoutError, SQLAlchemyError) as e:
+        pytest.skip(f'База данных недоступна: {e}')
+    track_queries(engine)
+    return engine
+
+
+@pytest.fixture
+async def db_session(db_engine):
+    """Сессия во внешней транзакции, которая откатывается после теста; commit в коде фиксирует savepoint."""
+    async with db_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, expire_on_commit=False, join_transaction_mode='create_savepoint')
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture
+def api_client(db_engine):
+    """TestClient API фермеров и полей; запросы теста идут через одно соединение во внешней транзакции,
+    которая откатывается после теста."""
+    app = FastAPI()
+    app.include_router(farmers_router)
+    app.include_router(fields_router)
+
+    with TestClient(app) as client:
+        # Соединение открывается в цикле событий TestClient, в котором выполняются запросы
+        async def begin():
+            connection = await db_engine.connect()
+            return connection, await connection.begin()
+
+        connection, transaction = client.portal.call(begin)
+
+        async def get_session():
+            async with AsyncSession(bind=connection, expire_on_commit=False,
+                                    join_transaction_mode='create_savepoint') as session:
+                yield session
+                await session.commit()
+
+        app.dependency_overrides[get_db_session] = get_session
+        app.dependency_overrides[get_read_session] = get_session
+        try:
+            yield client
+        finally:
+            client.portal.call(transaction.rollback)
+            client.portal.call(connection.close)
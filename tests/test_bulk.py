@@ -0,0 +1,90 @@
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.farmers.dao import FarmerDAO
+
+pytestmark = pytest.mark.anyio
+
+
+def farmer_row(number: int, **values) -> dict:
+    return {
+        'phone_number': f'+7999{number:07d}', 'first_name': 'Иван', 'last_name': f'Балк{number}',
+        'farm_name': f'Хозяйство {number}', 'date_of_birth': date(1980, 1, 1),
+        'email': f'bulk-{number}@example.com', 'address': 'Тульская область', **values,
+    }
+
+
+async def test_bulk_add_statuses(db_session):
+    existing = await FarmerDAO.add(db_session, **farmer_row(1))
+    statuses = await FarmerDAO.bulk_add(db_session, [
+        farmer_row(2),
+        farmer_row(1, phone_number='+79990000100'),  # уже есть по email
+        farmer_row(3),
+        farmer_row(3, phone_number='+79990000101'),  # повтор внутри запроса
+        farmer_row(4, phone_number=existing.phone_number),  # нарушает уникальность phone_number
+    ])
+    assert [item['status'] for item in statuses] == ['inserted', 'skipped', 'inserted', 'duplicate', 'error']
+    assert 'phone_number' in statuses[4]['error']
+    assert statuses[0]['id'] and statuses[2]['id'] and statuses[4]['id'] is None
+
+    # Строки без ошибок сохранены
+    emails = await db_session.execute(
+        select(FarmerDAO.model.email).where(FarmerDAO.model.id.in_([statuses[0]['id'], statuses[2]['id']])))
+    assert set(emails.scalars()) == {'bulk-2@example.com', 'bulk-3@example.com'}
+
+
+async def test_bulk_upsert_statuses(db_session):
+    existing = await FarmerDAO.add(db_session, **farmer_row(1))
+    statuses = await FarmerDAO.bulk_upsert(db_session, [
+        farmer_row(1, farm_name='Новое название'),
+        farmer_row(2, farm_name='Первая версия'),
+        farmer_row(2, farm_name='Вторая версия'),  # при upsert побеждает последняя строка
+    ])
+    assert [item['status'] for item in statuses] == ['updated', 'duplicate', 'inserted']
+    assert statuses[0]['id'] == existing.id
+
+    farm_names = await db_session.execute(
+        select(FarmerDAO.model.farm_name).where(FarmerDAO.model.id.in_([existing.id, statuses[2]['id']]))
+        .order_by(FarmerDAO.model.id))
+    assert farm_names.scalars().all() == ['Новое название', 'Вторая версия']
+
+
+def farmer_json(number: int, **values) -> dict:
+    return {**farmer_row(number), 'date_of_birth': '1980-01-01', **values}
+
+
+def test_bulk_endpoint_accepts_json(api_client):
+    response = api_client.post('/farmers/bulk/', json=[farmer_json(1), farmer_json(2), farmer_json(1)])
+    assert response.status_code == 200
+    assert response.json()['summary'] == {'inserted': 2, 'duplicate': 1}
+
+    response = api_client.post('/farmers/bulk/', params={'upsert': True},
+                               json=[farmer_json(1, farm_name='Новое название')])
+    assert response.json()['summary'] == {'updated': 1}
+
+    # Невалидная строка в JSON-списке отклоняет весь запрос
+    response = api_client.post('/farmers/bulk/', json=[farmer_json(3, date_of_birth='2999-01-01')])
+    assert response.status_code == 422
+
+
+def test_bulk_endpoint_accepts_ndjson(api_client):
+    lines = [farmer_json(1), farmer_json(2, date_of_birth='2999-01-01'), farmer_json(3, farm_name='')]
+    body = '\n'.join(json.dumps(line) for line in lines) + '\n{не json\n' + json.dumps(farmer_json(4))
+    response = api_client.post('/farmers/bulk/ndjson/', content=body.encode())
+    assert response.status_code == 200
+    report = response.json()
+    assert report['summary'] == {'inserted': 2, 'invalid': 3}
+    assert [row['status'] for row in report['rows']] == ['inserted', 'invalid', 'invalid', 'invalid', 'inserted']
+
+
+def test_fields_bulk_endpoint(api_client):
+    farmer_id = api_client.post('/farmers/bulk/', json=[farmer_json(1)]).json()['rows'][0]['id']
+    fields = [{'name': f'bulk-field-{index}', 'area_hectares': 5, 'farmer_id': farmer_id,
+               'coordinates': '[{"lat": 54.1, "lon": 37.6}, {"lat": 54.2, "lon": 37.6}, {"lat": 54.2, "lon": 37.7}]'}
+              for index in range(3)]
+    response = api_client.post('/fields/bulk/', json=fields)
+    assert response.status_code == 200
+    assert response.json()['summary'] == {'inserted': 3}
@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.farmers.dao import FarmerDAO
+from app.farmers.models import FarmerSummary
+from app.fields.dao import FieldsDAO
+
+pytestmark = pytest.mark.anyio
+
+
+def farmer_row(number: int) -> dict:
+    return {
+        'phone_number': f'+7997{number:07d}', 'first_name': 'Анна', 'last_name': f'Сводкина{number}',
+        'farm_name': f'Хозяйство {number}', 'date_of_birth': date(1985, 3, 3),
+        'email': f'summary-{number}@example.com', 'address': 'Орловская область',
+    }
+
+
+async def get_summary(session, farmer_id: int) -> FarmerSummary | None:
+    result = await session.execute(select(FarmerSummary).where(FarmerSummary.farmer_id == farmer_id))
+    return result.scalar_one_or_none()
+
+
+async def test_new_farmers_get_empty_summary(db_session):
+    farmer = await FarmerDAO.add(db_session, **farmer_row(1))
+    statuses = await FarmerDAO.bulk_add(db_session, [farmer_row(2), farmer_row(3)])
+    for farmer_id in (farmer.id, statuses[0]['id'], statuses[1]['id']):
+        summary = await get_summary(db_session, farmer_id)
+        assert (summary.fields_count, summary.total_area_hectares, summary.crop_mix) == (0, 0, {})
+
+
+async def test_summary_follows_field_changes(db_session):
+    farmer = await FarmerDAO.add(db_session, **farmer_row(1))
+    await FieldsDAO.add(db_session, name='summary-1', area_hectares=10, crop_rotation='Пшеница', farmer_id=farmer.id)
+    field = await FieldsDAO.add(db_session, name='summary-2', area_hectares=5, farmer_id=farmer.id)
+    summary = await get_summary(db_session, farmer.id)
+    assert (summary.fields_count, summary.total_area_hectares, summary.crop_mix) == (2, 15, {'Пшеница': 1, '': 1})
+
+    # Поле переходит к другому фермеру: пересчитываются сводки обоих
+    other = await FarmerDAO.add(db_session, **farmer_row(2))
+    await FieldsDAO.update(db_session, field, farmer_id=other.id)
+    farmer_id, other_id = farmer.id, other.id
+    db_session.expire_all()
+    assert (await get_summary(db_session, farmer_id)).total_area_hectares == 10
+    assert (await get_summary(db_session, other_id)).total_area_hectares == 5
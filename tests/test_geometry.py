@@ -0,0 +1,75 @@
+import math
+
+import pytest
+from sqlalchemy import text
+
+from app.fields.dao import FieldsDAO
+from app.fields.geometry import EARTH_RADIUS_M, geometry_columns, parse_coordinates, polygon_metrics
+
+# Квадрат 0.009° x 0.009° у экватора: сторона около 1 км
+SIDE_DEG = 0.009
+SIDE_M = math.radians(SIDE_DEG) * EARTH_RADIUS_M
+SQUARE = [(0.0, 0.0), (SIDE_DEG, 0.0), (SIDE_DEG, SIDE_DEG), (0.0, SIDE_DEG)]
+
+
+def test_parse_coordinates():
+    assert parse_coordinates('(54.1, 37.5)') == [(54.1, 37.5)]
+    points = parse_coordinates('[{"lat": 54.1, "lon": 37.5}, {"lat": "54.2", "lon": 37.6}]')
+    assert points == [(54.1, 37.5), (54.2, 37.6)]
+
+
+@pytest.mark.parametrize('coordinates', [
+    None, '', 'не координаты', '{"lat": 54.1, "lon": 37.5}', '[{"lat": 54.1}]', '[[54.1, 37.5]]', '42', 'null',
+    '[{"lat": "север", "lon": 37.5}]',
+])
+def test_parse_coordinates_of_unknown_shape(coordinates):
+    assert parse_coordinates(coordinates) == []
+
+
+@pytest.mark.anyio
+async def test_recompute_skips_unparsable_coordinates(db_session):
+    # Строки, записанные в обход валидации схем, не должны ронять пересчет
+    farmer_id = (await db_session.execute(text(
+        "INSERT INTO farmers (phone_number, first_name, last_name, date_of_birth, email, address, farm_name) "
+        "VALUES ('+79990000001', 'Имя', 'Фамилия', DATE '1980-01-01', 'recompute@example.com', 'Адрес', 'КФХ') "
+        "RETURNING id"
+    ))).scalar_one()
+    field_id = (await db_session.execute(text(
+        "INSERT INTO fields (name, area_hectares, coordinates, farmer_id) "
+        "VALUES ('recompute-field', 1, '{\"lat\": 54.1}', :farmer_id) RETURNING id"
+    ), {'farmer_id': farmer_id})).scalar_one()
+    assert await FieldsDAO.recompute_geometry(db_session) > 0
+    row = (await db_session.execute(text('SELECT geom, perimeter_m FROM fields WHERE id = :id'),
+                                    {'id': field_id})).one()
+    assert tuple(row) == (None, None)
+
+
+def test_square_metrics():
+    metrics = polygon_metrics([SQUARE])
+    assert metrics["area_hectares"][0] == pytest.approx(SIDE_M ** 2 / 10_000, rel=1e-3)
+    assert metrics["perimeter_m"][0] == pytest.approx(4 * SIDE_M, rel=1e-3)
+    assert metrics["centroid_lat"][0] == pytest.approx(SIDE_DEG / 2)
+    assert metrics["centroid_lon"][0] == pytest.approx(SIDE_DEG / 2)
+    assert (metrics["min_lat"][0], metrics["max_lon"][0]) == (0.0, SIDE_DEG)
+
+
+def test_vertex_order_does_not_change_area():
+    clockwise, counterclockwise = polygon_metrics([SQUARE, SQUARE[::-1]])["area_hectares"]
+    assert clockwise == pytest.approx(counterclockwise)
+
+
+def test_batch_matches_single_polygons():
+    shifted = [(lat + 1, lon + 2) for lat, lon in SQUARE]
+    triangle = SQUARE[:3]
+    batch = geometry_columns([shifted, [], triangle])
+    assert batch[0] == geometry_columns([shifted])[0]
+    assert batch[2] == geometry_columns([triangle])[0]
+    assert batch[1] == dict.fromkeys(("computed_area_hectares", "perimeter_m", "centroid_lat", "centroid_lon"))
+
+
+def test_degenerate_polygons():
+    line = geometry_columns([[(54.0, 37.0), (54.001, 37.0)]])[0]
+    assert line["computed_area_hectares"] == 0.0
+    assert line["perimeter_m"] > 0
+    # Без площади центр — среднее вершин
+    assert (line["centroid_lat"], line["centroid_lon"]) == (pytest.approx(54.0005), pytest.approx(37.0))
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.database import on_commit
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_callback_survives_savepoint_rollback(db_session):
+    calls = []
+    await db_session.execute(text('SELECT 1'))
+    on_commit(db_session, lambda: calls.append('commit'))
+    with pytest.raises(DBAPIError):
+        async with db_session.begin_nested():
+            await db_session.execute(text('SELECT 1 / 0'))
+    assert calls == []
+    await db_session.commit()
+    assert calls == ['commit']
+
+
+async def test_callback_is_dropped_on_rollback(db_session):
+    calls = []
+    await db_session.execute(text('SELECT 1'))
+    on_commit(db_session, lambda: calls.append('commit'))
+    await db_session.rollback()
+    await db_session.commit()
+    assert calls == []
@@ -0,0 +1,102 @@
+"""Число SQL-запросов списка фермеров не зависит от числа фермеров и их полей."""
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import get_db_session, get_read_session
+from app.farmers.dao import FarmerDAO
+from app.farmers.models import Farmer
+from app.farmers.router import router as farmers_router
+from app.fields.models import Field
+from app.query_counter import QueryCountMiddleware
+from app.testing import assert_endpoint_queries, assert_max_queries
+
+LAST_NAME = 'Счетчиков'
+
+
+def make_farmers(count: int, start: int = 0, fields_per_farmer: int = 3) -> list[Farmer]:
+    return [
+        Farmer(phone_number=f'+7998{number:07d}', first_name='Петр', last_name=LAST_NAME,
+               farm_name=f'Хозяйство {number}', date_of_birth=date(1975, 5, 5),
+               email=f'query-count-{number}@example.com', address='Тульская область',
+               fields=[Field(name=f'query-count-{number}-{index}', area_hectares=10, coordinates='(54.1, 37.6)')
+                       for index in range(fields_per_farmer)])
+        for number in range(start, start + count)
+    ]
+
+
+@pytest.mark.anyio
+async def test_find_all_loads_fields_without_n_plus_one(db_session):
+    db_session.add_all(make_farmers(10))
+    await db_session.flush()
+    db_session.expunge_all()
+
+    # Фермеры и их поля (selectinload) — два запроса на любое число фермеров
+    with assert_max_queries(2):
+        farmers = await FarmerDAO.find_all(db_session, last_name=LAST_NAME)
+    assert len(farmers) == 10 and all(len(farmer.fields) == 3 for farmer in farmers)
+
+
+@pytest.mark.anyio
+async def test_lazy_loading_in_a_loop_is_reported(db_session):
+    farmers = make_farmers(4)
+    db_session.add_all(farmers)
+    await db_session.flush()
+    with pytest.raises(AssertionError, match='N\\+1'):
+        with assert_max_queries(10):
+            for farmer in farmers:
+                await FarmerDAO.find_one_or_none_by_id(db_session, farmer.id)
+
+
+@pytest.fixture
+def seed_farmers(db_engine):
+    """Сохраняет фермеров с commit, чтобы их видели сессии приложения, и удаляет после теста."""
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+
+    async def seed(count: int, start: int) -> None:
+        async with session_maker() as session:
+            session.add_all(make_farmers(count, start))
+            await session.commit()
+
+    async def cleanup() -> None:
+        async with session_maker() as session:
+            farmer_ids = select(Farmer.id).where(Farmer.last_name == LAST_NAME)
+            await session.execute(delete(Field).where(Field.farmer_id.in_(farmer_ids)))
+            await session.execute(delete(Farmer).where(Farmer.last_name == LAST_NAME))
+            await session.commit()
+
+    yield lambda count, start=0: asyncio.run(seed(count, start))
+    asyncio.run(cleanup())
+
+
+@pytest.fixture
+def client(db_engine):
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+
+    async def get_session():
+        async with session_maker() as session:
+            yield session
+            await session.commit()
+
+    app = FastAPI()
+    app.include_router(farmers_router)
+    app.add_middleware(QueryCountMiddleware)
+    app.dependency_overrides[get_db_session] = get_session
+    app.dependency_overrides[get_read_session] = get_session
+    with TestClient(app) as client:
+        yield client
+
+
+def test_farmer_list_runs_constant_number_of_queries(client, seed_farmers):
+    seed_farmers(2)
+    response = assert_endpoint_queries(client, 'GET', '/farmers/', max_queries=2, params={'last_name': LAST_NAME})
+    assert len(response.json()) == 2
+
+    seed_farmers(20, start=2)
+    response = assert_endpoint_queries(client, 'GET', '/farmers/', max_queries=2, params={'last_name': LAST_NAME})
+    assert len(response.json()) == 22
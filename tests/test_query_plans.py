@@ -0,0 +1,130 @@
+"""Типовые запросы DAO должны обслуживаться индексами.
+
+При enable_seqscan = off планировщик выбирает Seq Scan, только если ни один индекс не подходит.
+Какой именно индекс он возьмет, зависит от статистики, поэтому перед проверкой таблицы
+заполняются типовым объемом данных внутри откатываемой транзакции и анализируются.
+"""
+import json
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.farmers.dao import FarmerDAO, FarmerSummaryDAO
+from app.farmers.models import Farmer
+from app.fields.dao import FieldsDAO
+from app.fields.models import Field
+
+pytestmark = pytest.mark.anyio
+
+AUDITED_TABLES = {'farmers', 'fields', 'farmer_summaries'}
+
+# Запросы в том виде, в каком их строят DAO для фильтров RBFarmer/RBField и страниц API,
+# и индексы, которые должны их обслуживать. Без проверки имени индекса план со сканированием
+# первичного ключа и Filter по нужной колонке тоже обходится без Seq Scan.
+QUERY_SHAPES = {
+    'farmers: страница по id': (FarmerDAO._list_query(limit=50, after_id=1000), {'farmers_pkey'}),
+    'farmers: по фамилии': (FarmerDAO._list_query(limit=50, last_name='Фамилия42'), {'ix_farmers_last_name_id'}),
+    'farmers: по имени': (FarmerDAO._list_query(limit=50, first_name='Имя42'), {'ix_farmers_first_name_id'}),
+    'farmers: по email': (select(Farmer).filter_by(email='farmer42@example.com'), {'farmers_email_key'}),
+    'farmers: со сводкой': (
+        FarmerDAO._with_stats_query(limit=50, after_id=1000),
+        {'farmers_pkey', 'farmer_summaries_pkey'},
+    ),
+    'farmers: поиск': (FarmerDAO._search_query('фамилия42'), {'ix_farmers_search_text'}),
+    'farmer_summaries: пересчет': (
+        FarmerSummaryDAO._summary_query({1, 2, 3}),
+        {'farmers_pkey', 'ix_fields_farmer_id_id'},
+    ),
+    'fields: страница по id': (FieldsDAO._fields_query(limit=50, after_id=1000), {'fields_pkey'}),
+    'fields: по фермеру': (FieldsDAO._fields_query(limit=50, farmer_id=42), {'ix_fields_farmer_id_id'}),
+    'fields: по севообороту': (
+        FieldsDAO._fields_query(limit=50, crop_rotation='Севооборот 7'),
+        {'ix_fields_crop_rotation_id'},
+    ),
+    'fields: по технологии': (
+        FieldsDAO._fields_query(limit=50, cultivation_technology='Технология 7'),
+        {'ix_fields_cultivation_technology_id'},
+    ),
+    'fields: по названию': (FieldsDAO._fields_query(name='Поле 42'), {'fields_name_key'}),
+    'fields: поля фермеров (selectinload)': (
+        select(Field).where(Field.farmer_id.in_([1, 2, 3])),
+        {'ix_fields_farmer_id_id'},
+    ),
+    'fields: в прямоугольнике': (FieldsDAO._geometry_query((54.0, 37.0, 54.05, 37.05)), {'ix_fields_geom'}),
+    'fields: поиск': (FieldsDAO._search_query('севооборот 7'), {'ix_fields_search_text'}),
+}
+
+
+SEED_SQL = (
+    """
+    INSERT INTO farmers (phone_number, first_name, last_name, date_of_birth, email, address, farm_name)
+    SELECT '+7900' || lpad(n::text, 7, '0'), 'Имя' || n % 500, 'Фамилия' || n, DATE '1980-01-01',
+           'seed' || n || '@example.com', 'Адрес ' || n, 'Хозяйство ' || n
+    FROM generate_series(1, 500) AS n
+    """,
+    """
+    INSERT INTO fields (name, area_hectares, crop_rotation, cultivation_technology, geom, farmer_id)
+    SELECT 'Участок ' || n, 10, 'Севооборот ' || n % 50, 'Технология ' || n % 50,
+           polygon(box(point(37 + n % 100 * 0.1, 54 + n / 100 * 0.1),
+                       point(37.05 + n % 100 * 0.1, 54.05 + n / 100 * 0.1))),
+           (SELECT min(id) FROM farmers WHERE email LIKE 'seed%') + n % 500
+    FROM generate_series(1, 3000) AS n
+    """,
+    'ANALYZE farmers, fields, farmer_summaries',
+)
+
+
+@pytest.fixture
+async def seeded_session(db_session):
+    for statement in SEED_SQL:
+        await db_session.execute(text(statement))
+    return db_session
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    tables = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in AUDITED_TABLES:
+        tables.append(plan['Relation Name'])
+    for child in plan.get('Plans', ()):
+        tables.extend(_seq_scans(child))
+    return tables
+
+
+def _index_names(plan: dict) -> set[str]:
+    names = {plan['Index Name']} if 'Index Name' in plan else set()
+    for child in plan.get('Plans', ()):
+        names |= _index_names(child)
+    return names
+
+
+async def explain(session: AsyncSession, query) -> dict:
+    connection = await session.connection()
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+    result = await connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}')
+    plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+
+async def _check_plan(session: AsyncSession, name: str) -> list[str]:
+    query, expected = QUERY_SHAPES[name]
+    await session.execute(text('SET LOCAL enable_seqscan = off'))
+    plan = await explain(session, query)
+    problems = [f'полное чтение {table}' for table in sorted(set(_seq_scans(plan)))]
+    missing = expected - _index_names(plan)
+    if missing:
+        problems.append(f'не используются индексы {", ".join(sorted(missing))}')
+    return problems
+
+
+@pytest.mark.parametrize('name', QUERY_SHAPES)
+async def test_query_uses_indexes(seeded_session, name):
+    problems = await _check_plan(seeded_session, name)
+    assert not problems, f'{name}: {"; ".join(problems)}'
+
+
+async def test_dropped_index_is_reported(seeded_session):
+    # Без индекса планировщик уходит в fields_pkey с Filter, и проверка должна это заметить
+    await seeded_session.execute(text('DROP INDEX ix_fields_crop_rotation_id'))
+    problems = await _check_plan(seeded_session, 'fields: по севообороту')
+    assert problems == ['не используются индексы ix_fields_crop_rotation_id']
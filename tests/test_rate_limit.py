@@ -0,0 +1,51 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import rate_limit
+from app.metrics import render_metrics
+from app.rate_limit import MemoryBucketStore, RateLimiter, login_email_limiter, login_ip_limiter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+async def test_bucket_allows_burst_then_refills(clock):
+    store = MemoryBucketStore(maxsize=10)
+    assert [await store.take('ip', capacity=3, rate=1) for _ in range(3)] == [0, 0, 0]
+    assert await store.take('ip', capacity=3, rate=1) == pytest.approx(1)
+    clock[0] += 0.5
+    assert await store.take('ip', capacity=3, rate=1) == pytest.approx(0.5)
+    clock[0] += 0.5
+    assert await store.take('ip', capacity=3, rate=1) == 0
+    # Корзины разных ключей независимы
+    assert await store.take('other', capacity=3, rate=1) == 0
+
+
+async def test_limiter_rejects_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, 'bucket_store', MemoryBucketStore(maxsize=10))
+    limiter = RateLimiter('test', capacity=2, per_minute=6)
+    await limiter.hit('user@example.com')
+    await limiter.hit('user@example.com')
+    with pytest.raises(HTTPException) as exc_info:
+        await limiter.hit('user@example.com')
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {'Retry-After': '10'}
+    assert (limiter.allowed, limiter.rejected) == (2, 1)
+    clock[0] += 10
+    await limiter.hit('user@example.com')
+
+
+def test_limiter_counters_in_metrics(monkeypatch):
+    monkeypatch.setattr(login_ip_limiter, 'allowed', 7)
+    monkeypatch.setattr(login_email_limiter, 'rejected', 3)
+    lines = render_metrics().splitlines()
+    assert 'rate_limit_login_ip_allowed 7' in lines
+    assert 'rate_limit_login_email_rejected 3' in lines
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from jose import JWTError, jwt
+
+from app.users.tokens import JWTCodec
+
+SECRET = 'test-secret'
+
+
+@pytest.fixture
+def codec():
+    return JWTCodec('HS256', SECRET, SECRET, cache_size=100)
+
+
+def test_token_type_is_checked(codec):
+    access = codec.encode({'sub': '1'}, 'access', timedelta(minutes=5))
+    refresh = codec.encode({'sub': '1', 'jti': 'a', 'fam': 'b'}, 'refresh', timedelta(days=1))
+    assert codec.decode(access, 'access')['sub'] == '1'
+    assert codec.decode(refresh, 'refresh')['jti'] == 'a'
+    with pytest.raises(JWTError):
+        codec.decode(access, 'refresh')
+    with pytest.raises(JWTError):
+        codec.decode(refresh, 'access')
+
+
+def test_untyped_token_is_access_only(codec):
+    legacy = jwt.encode({'sub': '1', 'exp': datetime.now(timezone.utc) + timedelta(minutes=5)}, SECRET)
+    assert codec.decode(legacy, 'access')['sub'] == '1'
+    # Повторная проверка берет payload из кэша, тип сверяется и для него
+    with pytest.raises(JWTError):
+        codec.decode(legacy, 'refresh')
+
+
+def test_expired_and_foreign_tokens_are_rejected(codec):
+    expired = codec.encode({'sub': '1'}, 'access', timedelta(seconds=-1))
+    foreign = JWTCodec('HS256', 'other-secret', 'other-secret', 10).encode({'sub': '1'}, 'access', timedelta(minutes=5))
+    for token in (expired, foreign):
+        with pytest.raises(JWTError):
+            codec.decode(token, 'access')